@@ -4,17 +4,21 @@ Provides customer-facing interface for vector ingestion and similarity search
 """
 
 import streamlit as st  # type: ignore[import-untyped]
-import prestodb
-from prestodb.exceptions import PrestoUserError
-from sentence_transformers import SentenceTransformer
 import pandas as pd
 import numpy as np
 import json
 import csv
 import os
 import time
-from typing import List, Tuple, Optional, cast
+from typing import List, cast
 import urllib3
+import bulk_loader
+import embedding_backends
+import embedding_cache
+import parallel_encoder
+import presto_pool
+import result_cache
+import vector_jobs
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
@@ -86,43 +90,28 @@ if 'ingestion_complete' not in st.session_state:
 
 # Helper Functions
 @st.cache_resource
-def load_embedding_model(model_name: str):
-    """Load and cache the embedding model"""
+def load_embedding_model(model_name: str, backend: str = "torch"):
+    """Load and cache the embedding model for the chosen inference backend"""
     try:
-        model = SentenceTransformer(model_name)
+        model = embedding_backends.load_backend(model_name, backend)
         return model
     except Exception as e:
         st.error(f"Failed to load model: {e}")
         return None
 
-def get_presto_connection(host: str, port: int, user: str, catalog: str, schema: str,
-                          http_scheme: str = 'http', principal_id: str = "", password: str = "",
-                          disable_ssl_verification: bool = False):
-    """Create Presto connection with optional basic authentication and SSL verification control"""
-    try:
-        # Build connection parameters
-        conn_params = {
-            'host': host,
-            'port': port,
-            'user': user,
-            'catalog': catalog,
-            'schema': schema,
-            'http_scheme': http_scheme,
-        }
-        
-        # Add basic authentication if credentials provided
-        if principal_id and password:
-            conn_params['auth'] = prestodb.auth.BasicAuthentication(principal_id, password)
-        
-        conn = prestodb.dbapi.connect(**conn_params)
-        
-        # Disable SSL verification if requested (for self-signed certificates)
-        if disable_ssl_verification and http_scheme == 'https':
-            conn._http_session.verify = False
-        
-        return conn
-    except Exception as e:
-        raise PrestoUserError(f"Connection Error: {e}")
+@st.cache_resource(show_spinner=False)
+def get_parallel_encoder(model_name: str, backend: str, workers: int) -> parallel_encoder.ParallelEncoder:
+    """Pool of encoding processes, each with its own copy of the model, kept across reruns"""
+    return parallel_encoder.ParallelEncoder(model_name, backend, workers=workers)
+
+@st.cache_resource(show_spinner=False)
+def get_connection_pool(host: str, port: int, user: str, catalog: str, schema: str,
+                        http_scheme: str = 'http', principal_id: str = "", password: str = "",
+                        disable_ssl_verification: bool = False) -> presto_pool.PrestoConnectionPool:
+    """Shared connection pool per set of connection settings, kept across reruns and sessions"""
+    return presto_pool.PrestoConnectionPool(presto_pool.ConnectionSettings(
+        host, port, user, catalog, schema, http_scheme, principal_id, password, disable_ssl_verification
+    ))
 
 def execute_query(conn, sql: str, fetch: bool = False):
     """Execute SQL query"""
@@ -140,81 +129,15 @@ def execute_query(conn, sql: str, fetch: bool = False):
         if cursor:
             cursor.close()
 
-def embed_text(model, text: str) -> str:
-    """Generate embedding for input text"""
-    embedding = model.encode(text, normalize_embeddings=True)
-    return ",".join(map(str, embedding.tolist()))
+@st.cache_resource(show_spinner=False)
+def get_embedding_cache(sqlite_path: str = "") -> embedding_cache.EmbeddingCache:
+    """Query-embedding cache shared across reruns, optionally backed by a SQLite file"""
+    return embedding_cache.EmbeddingCache(sqlite_path=sqlite_path or None)
 
-def find_similar_reviews(host: str, port: int, user: str, catalog: str, schema: str,
-                        table: str, vector_str: str, top_k: int, embedding_column: str = "embedding",
-                        http_scheme: str = 'http', principal_id: str = "", password: str = "",
-                        disable_ssl_verification: bool = False) -> List[int]:
-    """Execute vector search"""
-    conn = get_presto_connection(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
-    row_ids = []
-    
-    sql_query = f"""
-    SELECT *
-    FROM {catalog}.system.approx_nearest_neighbors(
-        CAST(ARRAY[{vector_str}] AS array(real)),
-        '{schema}.{table}.{embedding_column}',
-        {top_k}
-    )
-    """
-    
-    cursor = None
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql_query)
-        results = cursor.fetchall()
-        if results:
-            row_ids = [row[0] for row in results]
-    except Exception as e:
-        st.error(f"Vector search failed: {e}")
-    finally:
-        if cursor is not None:
-            cursor.close()
-        if conn:
-            conn.close()
-    
-    return row_ids
-
-def get_review_details(host: str, port: int, user: str, catalog: str, schema: str,
-                       table: str, row_ids: List[int], text_column: str = "comment",
-                       http_scheme: str = 'http', principal_id: str = "", password: str = "",
-                       disable_ssl_verification: bool = False) -> List[Tuple[int, str]]:
-    """Retrieve review text for matched IDs"""
-    conn = get_presto_connection(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
-    results = []
-    
-    if row_ids:
-        id_list_str = ", ".join(map(str, row_ids))
-        sql_lookup = f"""
-        SELECT row_id, {text_column}
-        FROM {catalog}.{schema}.{table}
-        WHERE row_id IN ({id_list_str})
-        """
-        
-        cursor = None
-        try:
-            cursor = conn.cursor()
-            cursor.execute(sql_lookup)
-            raw_results = cursor.fetchall()
-            
-            # Create ordered map and preserve order
-            comment_map = {row_id: comment for row_id, comment in raw_results}
-            for row_id in row_ids:
-                if row_id in comment_map:
-                    results.append((row_id, comment_map[row_id]))
-        except Exception as e:
-            st.error(f"Lookup failed: {e}")
-        finally:
-            if cursor is not None:
-                cursor.close()
-            if conn:
-                conn.close()
-    
-    return results
+@st.cache_resource(show_spinner=False)
+def get_result_cache(max_mb: int) -> result_cache.ResultCache:
+    """Search-result cache shared across reruns and sessions"""
+    return result_cache.ResultCache(max_bytes=max_mb * 1024 * 1024)
 
 # Main Application
 def main():
@@ -250,9 +173,9 @@ def main():
         # Test Connection (moved above table configuration)
         if st.button(" Test Connection", use_container_width=True):
             try:
-                conn = get_presto_connection(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
-                results, _ = execute_query(conn, "SELECT 1", fetch=True)
-                conn.close()
+                pool = get_connection_pool(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
+                with pool.acquire() as conn:
+                    results, _ = execute_query(conn, "SELECT 1", fetch=True)
                 if results:
                     st.success(" Connection successful!")
             except Exception as e:
@@ -274,11 +197,38 @@ def main():
             "Model Name",
             value="sentence-transformers/all-MiniLM-L6-v2"
         )
+        embedding_backend = st.selectbox(
+            "Inference backend",
+            embedding_backends.BACKENDS,
+            index=0,
+            help="int8 backends trade a little accuracy for faster CPU inference; ONNX needs optimum[onnxruntime]"
+        )
+        encode_workers = st.number_input(
+            "Encoding processes",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            help="Encode ingested text in this many processes, each with its own model copy"
+        )
+        query_cache_path = st.text_input(
+            "Query cache file (optional)",
+            value="",
+            placeholder="e.g., query_embeddings.db",
+            help="SQLite file that keeps query embeddings across restarts"
+        )
+        
+        # Result cache settings
+        use_result_cache = st.checkbox(
+            "Cache search results",
+            value=True,
+            help="Reuse results of identical searches until the table's Iceberg snapshot changes"
+        )
+        result_cache_mb = st.number_input("Result cache size (MB)", min_value=1, value=64, disabled=not use_result_cache)
         
         # Load model button
         if st.button("🔄 Load Model", use_container_width=True):
             with st.spinner("Loading embedding model..."):
-                st.session_state.model = load_embedding_model(model_name)
+                st.session_state.model = load_embedding_model(model_name, embedding_backend)
                 if st.session_state.model:
                     st.success(f"✅ Model loaded successfully!")
                     st.info(f"Embedding dimension: {st.session_state.model.get_sentence_embedding_dimension()}")
@@ -307,6 +257,33 @@ def main():
             
             s3_location = st.text_input("S3 Location", value=f"s3a://<bucketname>/{schema}")
             
+            insert_mode = st.radio(
+                "Insert mode",
+                ["SQL INSERT", "Bulk load (Parquet)"],
+                horizontal=True,
+                help="Bulk load writes Parquet files to S3 and copies them with one INSERT INTO ... SELECT"
+            )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                use_pipeline = st.checkbox(
+                    "Pipelined ingestion",
+                    value=False,
+                    help="Stream the CSV in chunks and overlap encoding with concurrent inserts"
+                )
+            with col2:
+                num_writers = st.number_input("Concurrent writers", min_value=1, max_value=16, value=4, disabled=not use_pipeline)
+            
+            if insert_mode == "Bulk load (Parquet)":
+                col1, col2 = st.columns(2)
+                with col1:
+                    staging_catalog = st.text_input("Staging catalog", value="hive", help="Hive catalog that can read the staging location")
+                    staging_schema = st.text_input("Staging schema", value="", placeholder=schema or "same as Schema", help="Hive schema for the staging table; created at the staging location if missing")
+                    s3_endpoint = st.text_input("S3 endpoint", value="", placeholder="e.g., https://s3.us-south.cloud-object-storage.appdomain.cloud")
+                with col2:
+                    s3_access_key = st.text_input("S3 access key", value="")
+                    s3_secret_key = st.text_input("S3 secret key", value="", type="password")
+            
             if uploaded_file is not None:
                 st.success(f" File uploaded: {uploaded_file.name}")
                 
@@ -335,109 +312,105 @@ def main():
                     status_text = st.empty()
                     
                     try:
-                        # Step 1: Load and process data
-                        status_text.text("Step 1/5: Loading data...")
-                        df: pd.DataFrame = pd.read_csv(uploaded_file, nrows=num_rows)
+                        if encode_workers > 1:
+                            status_text.text(f"Starting {encode_workers} encoding processes...")
+                            encoder = get_parallel_encoder(model_name, embedding_backend, encode_workers)
+                        else:
+                            encoder = st.session_state.model
                         
                         # Use selected column for text generation
                         if not selected_column:
                             st.error("Please select a column for embedding generation.")
                             return
                         
-                        # Filter to selected column and remove rows with NaN values
-                        df = cast(pd.DataFrame, df[[selected_column]].dropna().reset_index(drop=True))
+                        if not use_pipeline:
+                            # Step 1: Load and process data
+                            status_text.text("Step 1/5: Loading data...")
+                            df: pd.DataFrame = pd.read_csv(uploaded_file, nrows=num_rows)
                         
-                        # Use the selected column as text source
-                        df[text_column] = df[selected_column].astype(str)
-                        df['row_id'] = df.index + 1
-                        df = cast(pd.DataFrame, df[['row_id', text_column]])
-                        progress_bar.progress(20)
+                            # Filter to selected column and remove rows with NaN values
+                            df = cast(pd.DataFrame, df[[selected_column]].dropna().reset_index(drop=True))
                         
-                        # Step 2: Generate embeddings
-                        status_text.text("Step 2/5: Generating embeddings...")
-                        # Convert DataFrame column to list for encoding
-                        text_list = cast(List[str], df[text_column].tolist())
-                        # SentenceTransformer.encode accepts List[str] - type checker has incomplete stubs
-                        embeddings = st.session_state.model.encode(  # type: ignore[arg-type,call-overload]
-                            text_list,
-                            show_progress_bar=False,
-                            normalize_embeddings=True
-                        )
-                        df[embedding_column] = [emb.tolist() for emb in embeddings]
-                        progress_bar.progress(40)
+                            # Use the selected column as text source
+                            df[text_column] = df[selected_column].astype(str)
+                            df['row_id'] = df.index + 1
+                            df = cast(pd.DataFrame, df[['row_id', text_column]])
+                            progress_bar.progress(20)
+                        
+                            # Step 2: Generate embeddings
+                            status_text.text("Step 2/5: Generating embeddings...")
+                            # Convert DataFrame column to list for encoding
+                            text_list = cast(List[str], df[text_column].tolist())
+                            # SentenceTransformer.encode accepts List[str] - type checker has incomplete stubs
+                            embeddings = encoder.encode(  # type: ignore[arg-type,call-overload]
+                                text_list,
+                                show_progress_bar=False,
+                                normalize_embeddings=True
+                            )
+                            rows_ingested = len(df)
+                            progress_bar.progress(40)
                         
                         # Step 3: Create schema
                         status_text.text("Step 3/5: Creating schema...")
-                        conn = get_presto_connection(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
-                        create_schema_sql = f"""
-                        CREATE SCHEMA IF NOT EXISTS {catalog}.{schema}
-                        WITH (location = '{s3_location}')
-                        """
-                        execute_query(conn, create_schema_sql)
-                        conn.close()
+                        pool = get_connection_pool(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
+                        with pool.acquire() as conn:
+                            vector_jobs.create_schema(conn, catalog, schema, s3_location)
                         progress_bar.progress(50)
                         
                         # Step 4: Create table
                         status_text.text("Step 4/5: Creating table...")
-                        conn = get_presto_connection(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
-                        create_table_sql = f"""
-                        CREATE TABLE IF NOT EXISTS {catalog}.{schema}.{table} (
-                            row_id BIGINT,
-                            {text_column} VARCHAR,
-                            {embedding_column} ARRAY(REAL)
-                        )
-                        """
-                        execute_query(conn, create_table_sql)
-                        conn.close()
+                        with pool.acquire() as conn:
+                            vector_jobs.create_table(conn, catalog, schema, table, text_column, embedding_column)
                         progress_bar.progress(60)
                         
                         # Step 5: Insert data
                         status_text.text("Step 5/5: Inserting data...")
-                        conn = get_presto_connection(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
-                        cursor = conn.cursor()
-                        
-                        batch = []
-                        total_batches = (len(df) + batch_size - 1) // batch_size
-                        processed_rows = 0
+                        write = None
+                        if insert_mode == "Bulk load (Parquet)":
+                            write = vector_jobs.bulk_writer(
+                                catalog, schema, table, text_column, embedding_column,
+                                f"{s3_location.rstrip('/')}/_staging",
+                                bulk_loader.S3Config(s3_endpoint, s3_access_key, s3_secret_key), staging_catalog,
+                                staging_schema or None
+                            )
                         
-                        # Use itertuples() instead of iterrows() for better performance
-                        for row in df.itertuples(index=False, name='Row'):
-                            row_id = row[0]  # row_id is first column
-                            # Escape single quotes and handle potential SQL injection
-                            comment = str(row[1]).replace("'", "''").replace("\\", "\\\\")  # text_column is second
-                            embedding_array = "ARRAY[" + ",".join(map(str, row[2])) + "]"  # embedding_column is third
-                            batch.append(f"({row_id}, '{comment}', CAST({embedding_array} AS ARRAY(REAL)))")
-                            processed_rows += 1
+                        if use_pipeline:
+                            metrics_table = st.empty()
                             
-                            if len(batch) >= batch_size:
-                                insert_sql = f"INSERT INTO {catalog}.{schema}.{table} (row_id, {text_column}, {embedding_column}) VALUES {', '.join(batch)}"
-                                cursor.execute(insert_sql)
-                                batch = []
-                                progress = 60 + int(30 * processed_rows / len(df))
-                                progress_bar.progress(progress)
-                        
-                        if batch:
-                            insert_sql = f"INSERT INTO {catalog}.{schema}.{table} (row_id, {text_column}, {embedding_column}) VALUES {', '.join(batch)}"
-                            cursor.execute(insert_sql)
-                        
-                        conn.commit()
-                        cursor.close()
-                        conn.close()
+                            def show_progress(metrics):
+                                status_text.text(f"Step 5/5: Inserted {metrics['rows']} rows ({metrics['rows_per_s']} rows/s)...")
+                                metrics_table.dataframe(pd.DataFrame(metrics["stages"]))
+                            
+                            metrics = vector_jobs.ingest(
+                                pool.settings,
+                                lambda texts: encoder.encode(texts, show_progress_bar=False, normalize_embeddings=True),
+                                uploaded_file, selected_column, table, text_column, embedding_column,
+                                max_rows=num_rows, insert_batch_size=batch_size, writers=num_writers, write=write,
+                                create=False, progress=show_progress
+                            )
+                            show_progress(metrics)
+                            rows_ingested = metrics["rows"]
+                        else:
+                            row_ids = df['row_id'].to_numpy()
+                            with pool.acquire() as conn:
+                                if write is not None:
+                                    write(conn, row_ids, text_list, embeddings)
+                                else:
+                                    vector_jobs.insert_rows(
+                                        conn, catalog, schema, table, text_column, embedding_column,
+                                        row_ids, text_list, embeddings, batch_size,
+                                        progress=lambda done: progress_bar.progress(60 + int(30 * done / len(df)))
+                                    )
                         progress_bar.progress(90)
                         
                         # Step 6: Create vector index
                         status_text.text("Creating vector index...")
-                        conn = get_presto_connection(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification)
-                        cursor = conn.cursor()
-                        index_cmd = f"CALL {catalog}.system.CREATE_VEC_INDEX('{catalog}.{schema}.{table}.{embedding_column}')"
-                        cursor.execute(index_cmd)
-                        conn.commit()
-                        cursor.close()
-                        conn.close()
+                        with pool.acquire() as conn:
+                            vector_jobs.create_vector_index(conn, catalog, schema, table, embedding_column)
                         
                         progress_bar.progress(100)
                         status_text.text(" Ingestion complete!")
-                        st.success(f"Successfully ingested {len(df)} reviews with vector embeddings!")
+                        st.success(f"Successfully ingested {rows_ingested} reviews with vector embeddings!")
                         st.session_state.ingestion_complete = True
                         
                     except Exception as e:
@@ -460,6 +433,12 @@ def main():
                     placeholder="e.g., I love this product, it's amazing!",
                     height=100
                 )
+                filter_sql = st.text_input(
+                    "Filter (optional)",
+                    value="",
+                    placeholder="e.g., t.row_id > 1000",
+                    help="SQL condition on the table's columns (alias t), applied to the nearest neighbours"
+                )
             
             with col2:
                 top_k = st.slider("Number of results", min_value=1, max_value=50, value=10)
@@ -471,28 +450,33 @@ def main():
                 else:
                     with st.spinner("Searching for similar reviews..."):
                         try:
-                            # Generate embedding
                             start_time = time.time()
-                            vector_str = embed_text(st.session_state.model, query_text)
-                            
-                            # Find similar reviews
-                            row_ids = find_similar_reviews(
-                                host, port, user, catalog, schema, table, vector_str, top_k, embedding_column,
-                                http_scheme, user, password, disable_ssl_verification
+                            query_cache = get_embedding_cache(query_cache_path.strip())
+                            search_cache = get_result_cache(result_cache_mb) if use_result_cache else None
+                            results = vector_jobs.search(
+                                get_connection_pool(host, port, user, catalog, schema, http_scheme, user, password, disable_ssl_verification),
+                                lambda texts: st.session_state.model.encode(texts, show_progress_bar=False, normalize_embeddings=True),
+                                query_text, table, top_k, text_column, embedding_column, filter_sql.strip() or None,
+                                query_cache=query_cache, model_key=f"{model_name}:{embedding_backend}", results=search_cache
                             )
                             
-                            # Get review details
-                            if row_ids:
-                                results = get_review_details(
-                                    host, port, user, catalog, schema, table, row_ids, text_column,
-                                    http_scheme, user, password, disable_ssl_verification
-                                )
+                            if results:
                                 elapsed = time.time() - start_time
                                 
                                 st.session_state.search_results = results
                                 
                                 st.markdown(f'<div class="success-box"> Found {len(results)} similar reviews in {elapsed:.3f}s</div>', 
                                           unsafe_allow_html=True)
+                                st.caption(
+                                    f"Query embedding cache: {query_cache.stats['hits'] + query_cache.stats['disk_hits']} hits, "
+                                    f"{query_cache.stats['misses']} misses ({query_cache.hit_rate():.0%} hit rate)"
+                                )
+                                if use_result_cache:
+                                    st.caption(
+                                        f"Result cache: {search_cache.stats['hits']} hits, {search_cache.stats['misses']} misses, "
+                                        f"{search_cache.stats['invalidations']} invalidated, {search_cache.stats['evictions']} evicted, "
+                                        f"{search_cache.size_bytes / (1024 * 1024):.1f} MB"
+                                    )
                             else:
                                 st.warning("No matching reviews found.")
                                 st.session_state.search_results = []
@@ -509,9 +493,9 @@ def main():
                 col1, col2, col3 = st.columns([1, 1, 4])
                 with col1:
                     # Prepare CSV data
-                    csv_data = "Row ID,Review\n"
-                    for row_id, comment in st.session_state.search_results:
-                        csv_data += f'{row_id},"{comment.replace(chr(34), chr(34)+chr(34))}"\n'
+                    csv_data = "Row ID,Score,Review\n"
+                    for row_id, comment, score in st.session_state.search_results:
+                        csv_data += f'{row_id},{"" if score is None else score},"{comment.replace(chr(34), chr(34)+chr(34))}"\n'
                     
                     st.download_button(
                         label="📥 Download CSV",
@@ -523,8 +507,8 @@ def main():
                 with col2:
                     # Prepare JSON data
                     json_data = json.dumps([
-                        {"row_id": row_id, "review": comment}
-                        for row_id, comment in st.session_state.search_results
+                        {"row_id": row_id, "score": score, "review": comment}
+                        for row_id, comment, score in st.session_state.search_results
                     ], indent=2)
                     
                     st.download_button(
@@ -537,11 +521,12 @@ def main():
                 st.markdown("---")
                 
                 # Display each result
-                for idx, (row_id, comment) in enumerate(st.session_state.search_results, 1):
+                for idx, (row_id, comment, score) in enumerate(st.session_state.search_results, 1):
+                    score_label = "" if score is None else f" - Score: {score:.4f}"
                     with st.container():
                         st.markdown(f"""
                         <div class="result-card">
-                            <strong>#{idx} - Row ID: {row_id}</strong><br>
+                            <strong>#{idx} - Row ID: {row_id}{score_label}</strong><br>
                             {comment}
                         </div>
                         """, unsafe_allow_html=True)
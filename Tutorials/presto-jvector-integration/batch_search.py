@@ -0,0 +1,132 @@
+"""
+Batch similarity search for the Presto JVector tutorial
+Encodes a file of query texts in one batched SentenceTransformer.encode call
+and runs the single-query ANN searches concurrently over a bounded pool of
+Presto connections, writing ids, scores and text to Parquet or CSV.
+
+    python batch_search.py --host localhost --port 8080 --user admin \\
+        --catalog iceberg --schema review_vectors --table reviews_embeddings \\
+        --queries queries.txt --k 10 --workers 8 --output results.parquet
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+import embedding_backends
+import presto_pool
+import vector_search
+from embedding_cache import vector_literal
+
+RESULT_COLUMNS = ["query_index", "query", "rank", "row_id", "score", "text"]
+
+
+def read_queries(path: str, column: Optional[str] = None) -> List[str]:
+    """Query texts from a CSV column, or one per line from a text file"""
+    if column:
+        return pd.read_csv(path, usecols=[column])[column].dropna().astype(str).tolist()
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def batch_search(pool: presto_pool.PrestoConnectionPool, model, queries: List[str], table: str, top_k: int = 10,
+                 text_column: str = "comment", embedding_column: str = "embedding",
+                 filter_sql: Optional[str] = None, workers: int = 8, encode_batch_size: int = 64) -> pd.DataFrame:
+    """
+    Search every query and return one row per hit with RESULT_COLUMNS.
+
+    At most `workers` searches run at once; give the pool at least that many
+    connections. Queries whose search fails are reported on stderr and left
+    out of the result.
+    """
+    settings = pool.settings
+    embeddings = np.asarray(model.encode(queries, batch_size=encode_batch_size, show_progress_bar=False,
+                                         normalize_embeddings=True), dtype=np.float32)
+
+    def search_one(index: int):
+        with pool.acquire() as conn:
+            return vector_search.search(
+                conn, settings.catalog, settings.schema, table, vector_literal(embeddings[index]), top_k,
+                text_column, embedding_column, filter_sql
+            )
+
+    rows = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(search_one, i) for i in range(len(queries))]
+        for index, future in enumerate(futures):
+            try:
+                hits = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"query {index} failed: {e}", file=sys.stderr)
+                continue
+            for rank, (row_id, text, score) in enumerate(hits, 1):
+                rows.append((index, queries[index], rank, row_id, score, text))
+    if failed:
+        print(f"{failed} of {len(queries)} queries failed", file=sys.stderr)
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def write_results(results: pd.DataFrame, output: str):
+    if output.endswith(".parquet"):
+        results.to_parquet(output, index=False)
+    else:
+        results.to_csv(output, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run many similarity searches against a Presto JVector table.')
+    parser.add_argument('--host', required=True)
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', default='')
+    parser.add_argument('--http-scheme', default='http', choices=['http', 'https'])
+    parser.add_argument('--catalog', default='iceberg')
+    parser.add_argument('--schema', required=True)
+    parser.add_argument('--table', required=True)
+    parser.add_argument('--text-column', default='comment')
+    parser.add_argument('--embedding-column', default='embedding')
+    parser.add_argument('--model', default='sentence-transformers/all-MiniLM-L6-v2')
+    parser.add_argument('--backend', default='torch', choices=embedding_backends.BACKENDS,
+                        help='Embedding inference backend')
+    parser.add_argument('--queries', required=True, help='Text file with one query per line, or a CSV with --query-column')
+    parser.add_argument('--query-column', default=None, help='CSV column holding the query texts')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--filter', default=None, help='SQL condition on the table columns (alias t)')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent Presto queries')
+    parser.add_argument('--encode-batch-size', type=int, default=64)
+    parser.add_argument('--output', default='search_results.parquet', help='.parquet or .csv file')
+    args = parser.parse_args()
+
+
+    queries = read_queries(args.queries, args.query_column)
+    print(f'Loaded {len(queries)} queries')
+    model = embedding_backends.load_backend(args.model, args.backend)
+    settings = presto_pool.ConnectionSettings(
+        args.host, args.port, args.user, args.catalog, args.schema, args.http_scheme,
+        args.user, args.password, disable_ssl_verification=True
+    )
+    pool = presto_pool.PrestoConnectionPool(settings, size=args.workers)
+
+    start = time.time()
+    try:
+        results = batch_search(pool, model, queries, args.table, args.k, args.text_column, args.embedding_column,
+                               args.filter, args.workers, args.encode_batch_size)
+    finally:
+        pool.close()
+    elapsed = time.time() - start
+    write_results(results, args.output)
+    print(f'{len(results)} hits for {results["query_index"].nunique()} queries in {elapsed:.2f}s '
+          f'({len(queries) / elapsed:.1f} queries/s), written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Bulk loader for the Presto JVector ingestion path
+Writes rows as Parquet files with a native list<float> embedding column to an
+S3-compatible staging location, exposes them through an external Hive table
+and copies them into the Iceberg table with a single INSERT INTO ... SELECT,
+instead of rendering every float as SQL text.
+"""
+
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs as pafs
+
+# Rows per Parquet file; one file per INSERT batch keeps the staging listing small
+DEFAULT_ROWS_PER_FILE = 100_000
+
+
+@dataclass
+class S3Config:
+    """Credentials for the S3-compatible bucket behind the table's location"""
+    endpoint: str = ""
+    access_key: str = ""
+    secret_key: str = ""
+    region: str = "us-east-1"
+
+    def filesystem(self) -> pafs.S3FileSystem:
+        parsed = urlparse(self.endpoint) if self.endpoint else None
+        return pafs.S3FileSystem(
+            access_key=self.access_key or None,
+            secret_key=self.secret_key or None,
+            region=self.region,
+            endpoint_override=parsed.netloc if parsed else None,
+            scheme=parsed.scheme if parsed else "https",
+        )
+
+
+def _bucket_path(location: str) -> str:
+    """s3a://bucket/prefix -> bucket/prefix, the form pyarrow filesystems expect"""
+    parsed = urlparse(location)
+    return f"{parsed.netloc}{parsed.path}".rstrip("/")
+
+
+def embedding_array(embeddings: np.ndarray) -> pa.LargeListArray:
+    """
+    Wrap an (n, dim) float32 matrix as a list<float> column without copying per row.
+    64-bit offsets, so a single batch may hold more than 2^31 floats; Parquet
+    stores it as the same LIST type either way.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, dim = embeddings.shape
+    offsets = pa.array(np.arange(0, (n + 1) * dim, dim, dtype=np.int64))
+    return pa.LargeListArray.from_arrays(offsets, pa.array(embeddings.ravel()))
+
+
+def record_batch(row_ids: Sequence[int], texts: Sequence[str], embeddings: np.ndarray,
+                 text_column: str, embedding_column: str) -> pa.RecordBatch:
+    return pa.RecordBatch.from_arrays(
+        [pa.array(row_ids, type=pa.int64()), pa.array(texts, type=pa.string()), embedding_array(embeddings)],
+        names=["row_id", text_column, embedding_column],
+    )
+
+
+def write_staging_files(batches: Iterable[pa.RecordBatch], staging_location: str, s3: S3Config,
+                        rows_per_file: int = DEFAULT_ROWS_PER_FILE) -> Iterator[str]:
+    """Write record batches as Parquet files under staging_location, yielding each file's path"""
+    filesystem = s3.filesystem()
+    base = _bucket_path(staging_location)
+    writer: Optional[pq.ParquetWriter] = None
+    rows_in_file = 0
+    file_index = 0
+    path = ""
+    try:
+        for batch in batches:
+            offset = 0
+            while offset < batch.num_rows:
+                if writer is None:
+                    path = f"{base}/part-{file_index:05d}.parquet"
+                    writer = pq.ParquetWriter(path, batch.schema, filesystem=filesystem, compression="zstd")
+                take = min(batch.num_rows - offset, rows_per_file - rows_in_file)
+                writer.write_batch(batch.slice(offset, take))
+                offset += take
+                rows_in_file += take
+                if rows_in_file >= rows_per_file:
+                    writer.close()
+                    writer = None
+                    rows_in_file = 0
+                    file_index += 1
+                    yield path
+        if writer is not None:
+            writer.close()
+            writer = None
+            yield path
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def bulk_load(conn, batches: Iterable[pa.RecordBatch], catalog: str, schema: str, table: str,
+              text_column: str, embedding_column: str, staging_location: str, s3: S3Config,
+              staging_catalog: str = "hive", rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+              staging_schema: Optional[str] = None) -> Tuple[int, List[str]]:
+    """
+    Load record batches into catalog.schema.table through a Parquet staging table.
+
+    staging_location is an s3a:// prefix that the staging_catalog (a Hive
+    connector on the same bucket) can read. The staging table goes into
+    staging_catalog.staging_schema (default: the table's schema name), which is
+    created at staging_location if it does not exist. A unique sub-directory is
+    used per call and removed afterwards. Returns the number of files written
+    and their paths.
+    """
+    staging_name = f"staging_{table}_{uuid.uuid4().hex[:12]}"
+    location = f"{staging_location.rstrip('/')}/{staging_name}"
+    files = list(write_staging_files(batches, location, s3, rows_per_file))
+    if not files:
+        return 0, []
+
+    staging_schema = f"{staging_catalog}.{staging_schema or schema}"
+    staging_table = f"{staging_schema}.{staging_name}"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"CREATE SCHEMA IF NOT EXISTS {staging_schema} WITH (location = '{staging_location.rstrip('/')}')"
+        )
+        cursor.fetchall()
+        cursor.execute(f"""
+        CREATE TABLE {staging_table} (
+            row_id BIGINT,
+            {text_column} VARCHAR,
+            {embedding_column} ARRAY(REAL)
+        )
+        WITH (format = 'PARQUET', external_location = '{location}')
+        """)
+        cursor.fetchall()
+        cursor.execute(f"""
+        INSERT INTO {catalog}.{schema}.{table} (row_id, {text_column}, {embedding_column})
+        SELECT row_id, {text_column}, {embedding_column} FROM {staging_table}
+        """)
+        cursor.fetchall()
+    finally:
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+            s3.filesystem().delete_dir(_bucket_path(location))
+    return len(files), files
@@ -0,0 +1,184 @@
+"""
+Embedding backends for the Presto JVector tutorial
+Runs the same SentenceTransformer model through PyTorch, PyTorch with int8
+dynamic quantization, ONNX Runtime, or ONNX Runtime with int8 weights. A
+length-only tokenizer pass sorts the texts by token count and groups them into
+batches that hold a fixed budget of tokens, so short texts go through in large
+batches and long ones in small batches with little padding. The model then
+tokenizes each batch again, so the sort costs one extra tokenizer pass; that is
+small next to the forward pass and is skipped for a single text.
+
+    python embedding_backends.py --texts reviews.csv --column review --limit 2000 \\
+        --backends torch,torch-int8,onnx,onnx-int8
+
+The benchmark prints texts/s per backend and the cosine similarity of each
+backend's embeddings to the PyTorch ones. The ONNX backends need
+`pip install optimum[onnxruntime]`.
+"""
+
+import argparse
+import os
+import platform
+import time
+from typing import Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Padded tokens per batch; the batch size follows from the longest text in the batch
+DEFAULT_TOKEN_BUDGET = 16384
+MAX_BATCH_SIZE = 512
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "presto-jvector", "onnx-int8")
+
+
+class EmbeddingBackend:
+    """
+    A loaded SentenceTransformer plus length-sorted, token-budgeted batching.
+
+    encode() and get_sentence_embedding_dimension() match SentenceTransformer,
+    so a backend can be used wherever the app uses the model.
+    """
+
+    def __init__(self, model, name: str, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 max_batch_size: int = MAX_BATCH_SIZE):
+        self.model = model
+        self.name = name
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def token_lengths(self, texts: Sequence[str]) -> np.ndarray:
+        """Token count of each text, used only to sort and batch; the model tokenizes again in encode()"""
+        max_length = self.model.get_max_seq_length()
+        encoded = self.model.tokenizer(list(texts), add_special_tokens=True, truncation=True, max_length=max_length)
+        return np.fromiter((len(ids) for ids in encoded["input_ids"]), dtype=np.int64, count=len(texts))
+
+    def batches(self, lengths: np.ndarray, max_batch_size: Optional[int] = None) -> Iterator[np.ndarray]:
+        """Indices of texts grouped into batches of similar length within the token budget"""
+        max_batch_size = min(max_batch_size or self.max_batch_size, self.max_batch_size)
+        order = np.argsort(lengths, kind="stable")
+        start = 0
+        while start < len(order):
+            stop = start + 1
+            # lengths are ascending, so the last text of a batch sets its padded width
+            while (stop < len(order) and stop - start < max_batch_size
+                   and lengths[order[stop]] * (stop + 1 - start) <= self.token_budget):
+                stop += 1
+            yield order[start:stop]
+            start = stop
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: Optional[int] = None,
+               normalize_embeddings: bool = True, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """
+        Embeddings of sentences as SentenceTransformer.encode would return them.
+
+        batch_size caps the texts per batch on top of the token budget;
+        show_progress_bar is accepted and ignored, and any other keyword
+        raises TypeError rather than being silently dropped.
+        """
+        if kwargs:
+            raise TypeError(f"EmbeddingBackend.encode() does not support: {', '.join(sorted(kwargs))}")
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        output = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        if texts:
+            # one text is one batch, so there is nothing to sort by length
+            batches = [np.arange(1)] if len(texts) == 1 else self.batches(self.token_lengths(texts), batch_size)
+            for indices in batches:
+                output[indices] = self.model.encode(
+                    [texts[i] for i in indices], batch_size=len(indices), normalize_embeddings=normalize_embeddings,
+                    convert_to_numpy=True, show_progress_bar=False
+                )
+        return output[0] if single else output
+
+
+def _quantization_config() -> str:
+    return "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx512_vnni"
+
+
+def _onnx_int8_model(model_name: str):
+    """Quantize the ONNX export once per model and load it from the local cache afterwards"""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    config = _quantization_config()
+    local_dir = os.path.join(CACHE_DIR, model_name.replace("/", "--"))
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    if not os.path.exists(os.path.join(local_dir, file_name)):
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save(local_dir)
+        export_dynamic_quantized_onnx_model(model, config, local_dir)
+    return SentenceTransformer(local_dir, device="cpu", backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def load_backend(model_name: str = DEFAULT_MODEL, backend: str = "torch",
+                 token_budget: int = DEFAULT_TOKEN_BUDGET) -> EmbeddingBackend:
+    """Load model_name for one of BACKENDS"""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        model = SentenceTransformer(model_name, device="cpu")
+    elif backend == "torch-int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    elif backend == "onnx":
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+    elif backend == "onnx-int8":
+        model = _onnx_int8_model(model_name)
+    else:
+        raise ValueError(f"Unsupported backend: {backend}")
+    return EmbeddingBackend(model, backend, token_budget)
+
+
+def benchmark(texts: List[str], model_name: str = DEFAULT_MODEL, backends: Sequence[str] = BACKENDS,
+              token_budget: int = DEFAULT_TOKEN_BUDGET) -> List[dict]:
+    """Throughput of each backend and the cosine agreement of its embeddings with PyTorch"""
+    baseline = None
+    results = []
+    for name in ["torch"] + [b for b in backends if b != "torch"]:
+        start = time.perf_counter()
+        backend = load_backend(model_name, name, token_budget)
+        load_s = time.perf_counter() - start
+        backend.encode(texts[:32])  # warm-up
+        start = time.perf_counter()
+        embeddings = backend.encode(texts)
+        encode_s = time.perf_counter() - start
+        if baseline is None:
+            baseline = embeddings
+        cosine = (embeddings * baseline).sum(axis=1)
+        results.append({
+            "backend": name,
+            "load_s": round(load_s, 2),
+            "texts_per_s": round(len(texts) / encode_s, 1),
+            "mean_cosine": round(float(cosine.mean()), 5),
+            "min_cosine": round(float(cosine.min()), 5),
+        })
+        print(results[-1], flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare embedding backends on CPU.')
+    parser.add_argument('--texts', required=True, help='Text file with one text per line, or a CSV with --column')
+    parser.add_argument('--column', default=None, help='CSV column holding the texts')
+    parser.add_argument('--limit', type=int, default=2000, help='Number of texts to encode')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--backends', default=",".join(BACKENDS), help='Comma separated backends to compare')
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET, help='Padded tokens per batch')
+    args = parser.parse_args()
+
+    if args.column:
+        import pandas as pd
+        texts = pd.read_csv(args.texts, usecols=[args.column], nrows=args.limit)[args.column].dropna().astype(str).tolist()
+    else:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()][:args.limit]
+    print(f'{len(texts)} texts, model {args.model}')
+    benchmark(texts, args.model, args.backends.split(","), args.token_budget)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Query-embedding cache for the Presto JVector tutorial
+Keeps recent query embeddings in memory as float32 arrays, keyed by model name
+and normalized query text, with LRU eviction and a time-to-live. An optional
+SQLite file adds a second tier that survives restarts and is shared by
+processes on the same host.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_S = 24 * 3600.0
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace so trivially different spellings of a query share an entry"""
+    return " ".join(text.split())
+
+
+def vector_literal(vector: np.ndarray) -> str:
+    """Comma-separated float32 values for an ARRAY[...] literal; 9 significant digits round-trip float32"""
+    return ",".join(np.char.mod("%.9g", np.asarray(vector, dtype=np.float32)))
+
+
+class EmbeddingCache:
+    """
+    LRU/TTL cache of query embeddings.
+
+    get_or_encode(model_name, text, encode) returns the cached vector or calls
+    encode(text) and stores the result. With sqlite_path set, evicted or
+    expired in-memory entries can still be served from disk.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S,
+                 sqlite_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT, query TEXT, vector BLOB, created_at REAL, PRIMARY KEY (model, query))"
+            )
+            self._db.commit()
+
+    def _fresh(self, created_at: float) -> bool:
+        return time.time() - created_at < self.ttl_s
+
+    def _remember(self, key, vector: np.ndarray, created_at: float):
+        self._entries[key] = (vector, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _load(self, key) -> Optional[Tuple[np.ndarray, float]]:
+        row = self._db.execute(
+            "SELECT vector, created_at FROM embeddings WHERE model = ? AND query = ?", key
+        ).fetchone()
+        if row is None or not self._fresh(row[1]):
+            return None
+        return np.frombuffer(row[0], dtype=np.float32), row[1]
+
+    def _store(self, key, vector: np.ndarray, created_at: float):
+        self._db.execute(
+            "INSERT OR REPLACE INTO embeddings (model, query, vector, created_at) VALUES (?, ?, ?, ?)",
+            (*key, vector.tobytes(), created_at)
+        )
+        self._db.commit()
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry[1]):
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+            if self._db is not None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._remember(key, *entry)
+                    self.stats["disk_hits"] += 1
+                    return entry[0]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, model_name: str, text: str, vector) -> np.ndarray:
+        key = (model_name, normalize_query(text))
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, vector, created_at)
+            if self._db is not None:
+                self._store(key, vector, created_at)
+        return vector
+
+    def get_or_encode(self, model_name: str, text: str, encode: Callable[[str], np.ndarray]) -> np.ndarray:
+        vector = self.get(model_name, text)
+        if vector is None:
+            # Concurrent misses for the same query may both encode; the later put wins
+            vector = self.put(model_name, text, encode(normalize_query(text)))
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
@@ -0,0 +1,253 @@
+"""
+Pipelined ingestion for the Presto JVector tutorial
+Reads a CSV in chunks, encodes each chunk and inserts it with several Presto
+writers at once. The stages are joined by bounded queues, so encoding of the
+next chunk overlaps with the inserts of the previous ones, a slow stage blocks
+the ones before it instead of buffering, and memory stays bounded by
+queue_size chunks regardless of the file size.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Marks the end of a queue's stream
+_DONE = object()
+
+# A chunk travelling through the pipeline: (chunk index, row_ids, texts, embeddings or None)
+Chunk = Tuple[int, np.ndarray, List[str], Optional[np.ndarray]]
+
+
+@dataclass
+class StageMetrics:
+    """Throughput of one pipeline stage; blocked_s is time spent waiting on a full or empty queue"""
+    name: str
+    rows: int = 0
+    chunks: int = 0
+    busy_s: float = 0.0
+    blocked_s: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, rows: int, busy_s: float, blocked_s: float = 0.0):
+        with self._lock:
+            self.rows += rows
+            self.chunks += 1
+            self.busy_s += busy_s
+            self.blocked_s += blocked_s
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.busy_s if self.busy_s else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "busy_s": round(self.busy_s, 3),
+            "blocked_s": round(self.blocked_s, 3),
+            "rows_per_s": round(self.rows_per_s, 1),
+        }
+
+
+def values_insert_sql(catalog: str, schema: str, table: str, text_column: str, embedding_column: str,
+                      row_ids, texts: List[str], embeddings: np.ndarray) -> str:
+    """INSERT ... VALUES statement for one batch of rows"""
+    values = []
+    for row_id, text, embedding in zip(row_ids, texts, embeddings):
+        # Escape single quotes and handle potential SQL injection
+        comment = str(text).replace("'", "''").replace("\\", "\\\\")
+        embedding_array = "ARRAY[" + ",".join(map(str, embedding.tolist())) + "]"
+        values.append(f"({int(row_id)}, '{comment}', CAST({embedding_array} AS ARRAY(REAL)))")
+    return (f"INSERT INTO {catalog}.{schema}.{table} (row_id, {text_column}, {embedding_column}) "
+            f"VALUES {', '.join(values)}")
+
+
+def read_chunks(source, column: str, chunk_rows: int, max_rows: Optional[int] = None,
+                start_row_id: int = 1, start_chunk: int = 0) -> Iterator[Chunk]:
+    """
+    Non-null values of one CSV column among the first max_rows rows, in chunks
+    of chunk_rows CSV rows with consecutive row ids. Chunks before start_chunk
+    are read to keep the row ids stable but not yielded; a chunk whose values
+    are all null is yielded empty so that every chunk index is accounted for.
+    """
+    next_id = start_row_id
+    for index, frame in enumerate(pd.read_csv(source, usecols=[column], chunksize=chunk_rows, nrows=max_rows)):
+        texts = frame[column].dropna().astype(str).tolist()
+        if index >= start_chunk:
+            yield index, np.arange(next_id, next_id + len(texts), dtype=np.int64), texts, None
+        next_id += len(texts)
+
+
+class IngestPipeline:
+    """
+    CSV reader -> encoder -> writers, each stage in its own thread(s).
+
+    connect() is called once per writer thread and must return a new Presto
+    connection; encode(texts) returns an (n, dim) array. write(conn, row_ids,
+    texts, embeddings) inserts one chunk and defaults to INSERT ... VALUES
+    statements of insert_batch_size rows. on_written(chunk_index, row_ids),
+    if given, is called from the writer thread once a chunk is inserted.
+    """
+
+    def __init__(self, connect: Callable, encode: Callable[[List[str]], np.ndarray],
+                 catalog: str, schema: str, table: str, text_column: str, embedding_column: str,
+                 chunk_rows: int = 1000, insert_batch_size: int = 100, writers: int = 4,
+                 queue_size: int = 4, write: Optional[Callable] = None,
+                 on_written: Optional[Callable[[int, np.ndarray], None]] = None):
+        self.connect = connect
+        self.encode = encode
+        self.catalog = catalog
+        self.schema = schema
+        self.table = table
+        self.text_column = text_column
+        self.embedding_column = embedding_column
+        self.chunk_rows = chunk_rows
+        self.insert_batch_size = insert_batch_size
+        self.writers = writers
+        self.queue_size = queue_size
+        self.write = write or self._insert_values
+        self.on_written = on_written
+        self.metrics = {name: StageMetrics(name) for name in ("read", "encode", "write")}
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _insert_values(self, conn, row_ids, texts, embeddings):
+        cursor = conn.cursor()
+        try:
+            for start in range(0, len(texts), self.insert_batch_size):
+                stop = start + self.insert_batch_size
+                cursor.execute(values_insert_sql(
+                    self.catalog, self.schema, self.table, self.text_column, self.embedding_column,
+                    row_ids[start:stop], texts[start:stop], embeddings[start:stop]
+                ))
+                cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> float:
+        """Blocking put that gives up once the pipeline is stopping; returns the time spent blocked"""
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        return time.perf_counter() - start
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _reader(self, chunks: Iterator[Chunk], out: queue.Queue):
+        try:
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                busy = time.perf_counter() - start
+                if chunk is None:
+                    break
+                self.metrics["read"].add(len(chunk[2]), busy, self._put(out, chunk))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out, _DONE)
+
+    def _encoder(self, inp: queue.Queue, out: queue.Queue):
+        try:
+            while True:
+                start = time.perf_counter()
+                chunk = self._get(inp)
+                waited = time.perf_counter() - start
+                if chunk is _DONE:
+                    break
+                index, row_ids, texts, _ = chunk
+                start = time.perf_counter()
+                embeddings = np.asarray(self.encode(texts), dtype=np.float32) if texts else None
+                busy = time.perf_counter() - start
+                self.metrics["encode"].add(len(texts), busy,
+                                           waited + self._put(out, (index, row_ids, texts, embeddings)))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.writers):
+                self._put(out, _DONE)
+
+    def _writer(self, inp: queue.Queue):
+        conn = None
+        try:
+            conn = self.connect()
+            while True:
+                start = time.perf_counter()
+                chunk = self._get(inp)
+                waited = time.perf_counter() - start
+                if chunk is _DONE:
+                    break
+                index, row_ids, texts, embeddings = chunk
+                start = time.perf_counter()
+                if texts:
+                    self.write(conn, row_ids, texts, embeddings)
+                self.metrics["write"].add(len(texts), time.perf_counter() - start, waited)
+                if self.on_written is not None:
+                    self.on_written(index, row_ids)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def run(self, source, column: str, max_rows: Optional[int] = None, start_row_id: int = 1,
+            progress: Optional[Callable[[dict], None]] = None, progress_interval: float = 1.0,
+            start_chunk: int = 0) -> dict:
+        """
+        Ingest one CSV column and return the per-stage metrics.
+
+        progress, if given, is called from the calling thread every
+        progress_interval seconds with the current metrics, so it may update
+        a UI that is not thread-safe. Chunks before start_chunk are skipped.
+        """
+        chunks = read_chunks(source, column, self.chunk_rows, max_rows, start_row_id, start_chunk)
+        to_encode: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        to_write: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._reader, args=(chunks, to_encode), name="ingest-read", daemon=True),
+            threading.Thread(target=self._encoder, args=(to_encode, to_write), name="ingest-encode", daemon=True),
+        ] + [
+            threading.Thread(target=self._writer, args=(to_write,), name=f"ingest-write-{i}", daemon=True)
+            for i in range(self.writers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(progress_interval)
+                if progress is not None:
+                    progress(self.summary(time.perf_counter() - start))
+        if self._error is not None:
+            raise self._error
+        return self.summary(time.perf_counter() - start)
+
+    def summary(self, elapsed_s: float) -> dict:
+        written = self.metrics["write"].rows
+        return {
+            "rows": written,
+            "elapsed_s": round(elapsed_s, 3),
+            "rows_per_s": round(written / elapsed_s, 1) if elapsed_s else 0.0,
+            "stages": [m.as_dict() for m in self.metrics.values()],
+        }
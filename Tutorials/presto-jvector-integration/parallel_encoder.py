@@ -0,0 +1,206 @@
+"""
+Multi-process embedding for large ingests
+Shards texts across worker processes, each of which loads the model once and
+runs it with a few intra-op threads. Workers write embeddings straight into
+shared memory (for streaming) or into a memory-mapped .npy file (for whole
+files), so only texts and slot numbers are pickled between processes.
+
+    encoder = ParallelEncoder("sentence-transformers/all-MiniLM-L6-v2", workers=16)
+    for embeddings in encoder.encode_stream(chunks):   # chunks: iterable of lists of texts
+        ...
+    encoder.encode_to_memmap(texts, "embeddings.npy")
+    encoder.close()
+"""
+
+import multiprocessing as mp
+import os
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+import embedding_backends
+
+DEFAULT_THREADS_PER_WORKER = 2
+DEFAULT_SLOT_ROWS = 1024
+
+# Per-worker state, set up once by _init_worker
+_model = None
+_buffers = {}
+
+
+def _init_worker(model_name: str, backend: str, threads: int):
+    global _model
+    import torch
+    torch.set_num_threads(threads)
+    _model = embedding_backends.load_backend(model_name, backend)
+
+
+def _dimension() -> int:
+    return _model.get_sentence_embedding_dimension()
+
+
+def _attach(name: str, shape) -> np.ndarray:
+    if name not in _buffers:
+        shm = shared_memory.SharedMemory(name=name)
+        _buffers[name] = (shm, np.ndarray(shape, dtype=np.float32, buffer=shm.buf))
+    return _buffers[name][1]
+
+
+def _encode_into_slot(shm_name: str, shape, slot: int, texts: List[str], normalize_embeddings: bool) -> int:
+    out = _attach(shm_name, shape)
+    out[slot, :len(texts)] = _model.encode(texts, normalize_embeddings=normalize_embeddings)
+    return len(texts)
+
+
+def _encode_into_file(path: str, start: int, texts: List[str], normalize_embeddings: bool) -> int:
+    out = np.load(path, mmap_mode="r+")
+    out[start:start + len(texts)] = _model.encode(texts, normalize_embeddings=normalize_embeddings)
+    out.flush()
+    del out
+    return len(texts)
+
+
+class ParallelEncoder:
+    """
+    A pool of `workers` processes, each holding one copy of the model.
+
+    encode_stream() keeps at most `slots` chunks in flight and yields their
+    embeddings in input order; encode() is a drop-in encode(texts) callable
+    for ingest_pipeline. Chunks longer than slot_rows are split.
+
+    The shared-memory slots belong to one call at a time: concurrent calls
+    from other threads wait, and an encode_stream() holds them until it is
+    exhausted or closed, so do not call the encoder again while iterating one.
+    """
+
+    def __init__(self, model_name: str = embedding_backends.DEFAULT_MODEL, backend: str = "torch",
+                 workers: Optional[int] = None, threads_per_worker: int = DEFAULT_THREADS_PER_WORKER,
+                 slot_rows: int = DEFAULT_SLOT_ROWS, slots: Optional[int] = None):
+        self.workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.slot_rows = slot_rows
+        self.slots = slots or 2 * self.workers
+        # spawn, so workers do not inherit the parent's threads or a half-initialized torch
+        self._pool = mp.get_context("spawn").Pool(
+            self.workers, initializer=_init_worker, initargs=(model_name, backend, threads_per_worker)
+        )
+        self.dimension = self._pool.apply(_dimension)
+        self._shape = (self.slots, slot_rows, self.dimension)
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self._shape)) * 4)
+        self._out = np.ndarray(self._shape, dtype=np.float32, buffer=self._shm.buf)
+        self._lock = threading.Lock()
+
+    def _split(self, chunks: Iterable[List[str]]) -> Iterator[List[str]]:
+        for chunk in chunks:
+            for start in range(0, len(chunk), self.slot_rows):
+                yield list(chunk[start:start + self.slot_rows])
+
+    def _stream_pieces(self, pieces: Iterable[List[str]], normalize_embeddings: bool) -> Iterator[np.ndarray]:
+        """
+        Caller holds self._lock. If the generator is closed early or raises,
+        it waits for the workers still writing into slots before returning,
+        so the next holder of the lock gets the slots to itself.
+        """
+        in_flight = deque()
+        free = deque(range(self.slots))
+        pieces = iter(pieces)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and free:
+                    piece = next(pieces, None)
+                    if piece is None:
+                        exhausted = True
+                        break
+                    slot = free.popleft()
+                    in_flight.append((slot, self._pool.apply_async(_encode_into_slot, (self._shm.name, self._shape, slot, piece, normalize_embeddings))))
+                if not in_flight:
+                    return
+                slot, result = in_flight.popleft()
+                rows = result.get()
+                embeddings = self._out[slot, :rows].copy()
+                free.append(slot)
+                yield embeddings
+        finally:
+            for _, result in in_flight:
+                result.wait()
+
+    def encode_stream(self, chunks: Iterable[List[str]], normalize_embeddings: bool = True) -> Iterator[np.ndarray]:
+        """Embeddings for each chunk of texts, in order; up to `slots` pieces are encoded ahead"""
+        with self._lock:
+            yield from self._encode_stream(chunks, normalize_embeddings)
+
+    def _encode_stream(self, chunks: Iterable[List[str]], normalize_embeddings: bool) -> Iterator[np.ndarray]:
+        pending = []
+        sizes = deque()
+
+        def pieces():
+            for chunk in chunks:
+                chunk = list(chunk)
+                sizes.append(len(chunk))
+                yield from self._split([chunk]) if chunk else ()
+
+        stream = self._stream_pieces(pieces(), normalize_embeddings)
+        try:
+            for embeddings in stream:
+                pending.append(embeddings)
+                while sizes and sum(len(p) for p in pending) >= sizes[0]:
+                    size = sizes.popleft()
+                    if size == 0:
+                        yield np.empty((0, self.dimension), dtype=np.float32)
+                        continue
+                    merged = np.concatenate(pending) if len(pending) > 1 else pending[0]
+                    yield merged[:size]
+                    pending = [merged[size:]] if len(merged) > size else []
+        finally:
+            # Drains the in-flight pieces before encode_stream releases the lock
+            stream.close()
+        while sizes:
+            sizes.popleft()
+            yield np.empty((0, self.dimension), dtype=np.float32)
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        """
+        Embeddings of texts, spread over all workers.
+
+        Takes the SentenceTransformer.encode keywords the app passes;
+        show_progress_bar is accepted and ignored, and any other keyword
+        raises TypeError rather than being silently dropped.
+        """
+        if kwargs:
+            raise TypeError(f"ParallelEncoder.encode() does not support: {', '.join(sorted(kwargs))}")
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        piece_rows = min(self.slot_rows, -(-len(texts) // self.workers))
+        pieces = [texts[i:i + piece_rows] for i in range(0, len(texts), piece_rows)]
+        with self._lock:
+            return np.concatenate(list(self._stream_pieces(pieces, normalize_embeddings)))
+
+    def encode_to_memmap(self, texts: List[str], path: str, normalize_embeddings: bool = True) -> np.ndarray:
+        """Write the embeddings of texts to a .npy file that workers fill in place; returns it memory-mapped"""
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(len(texts), self.dimension))
+        del out
+        results = [
+            self._pool.apply_async(_encode_into_file,
+                                   (path, start, texts[start:start + self.slot_rows], normalize_embeddings))
+            for start in range(0, len(texts), self.slot_rows)
+        ]
+        for result in results:
+            result.get()
+        return np.load(path, mmap_mode="r")
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
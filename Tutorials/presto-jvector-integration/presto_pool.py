@@ -0,0 +1,153 @@
+"""
+Presto connection pool for the JVector tutorial
+prestodb connections are cheap objects, but each one owns its own requests
+session, so opening a connection per query pays a fresh TCP (and TLS)
+handshake every time. The pool keeps connections, and with them their
+keep-alive HTTP sessions, for reuse across queries and Streamlit reruns.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Iterator, Tuple
+
+import prestodb
+
+
+@dataclass(frozen=True)
+class ConnectionSettings:
+    """Everything that identifies a Presto connection; hashable so it can key a cache"""
+    host: str
+    port: int
+    user: str
+    catalog: str
+    schema: str
+    http_scheme: str = "http"
+    principal_id: str = ""
+    password: str = ""
+    disable_ssl_verification: bool = False
+
+    def connect(self):
+        """Create Presto connection with optional basic authentication and SSL verification control"""
+        conn_params = {
+            'host': self.host,
+            'port': self.port,
+            'user': self.user,
+            'catalog': self.catalog,
+            'schema': self.schema,
+            'http_scheme': self.http_scheme,
+        }
+        if self.principal_id and self.password:
+            conn_params['auth'] = prestodb.auth.BasicAuthentication(self.principal_id, self.password)
+        conn = prestodb.dbapi.connect(**conn_params)
+        # Disable SSL verification if requested (for self-signed certificates)
+        if self.disable_ssl_verification and self.http_scheme == 'https':
+            conn._http_session.verify = False
+        return conn
+
+
+class PrestoConnectionPool:
+    """
+    Up to `size` connections for one ConnectionSettings.
+
+    acquire() hands out an idle connection (most recently used first, so its
+    HTTP session is most likely still alive) or opens a new one, and blocks
+    while all `size` are in use. Connections idle for longer than
+    validate_after seconds are checked with SELECT 1 first; a connection whose
+    query raised is discarded rather than returned to the pool.
+    """
+
+    def __init__(self, settings: ConnectionSettings, size: int = 4, validate_after: float = 30.0):
+        self.settings = settings
+        self.size = size
+        self.validate_after = validate_after
+        self._idle: Deque[Tuple[object, float]] = deque()
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"created": 0, "reused": 0, "validated": 0, "discarded": 0}
+
+    def _checkout(self):
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("PrestoConnectionPool is closed")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    return conn, released_at
+                if self._open < self.size:
+                    self._open += 1
+                    return None, 0.0
+                self._cond.wait()
+
+    def _validate(self, conn) -> bool:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+        finally:
+            cursor.close()
+
+    def _new_connection(self):
+        try:
+            conn = self.settings.connect()
+        except Exception:
+            self._forget()
+            raise
+        self.stats["created"] += 1
+        return conn
+
+    def _forget(self, conn=None):
+        if conn is not None:
+            _close(conn)
+            self.stats["discarded"] += 1
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def acquire(self) -> Iterator[object]:
+        conn, released_at = self._checkout()
+        if conn is None:
+            conn = self._new_connection()
+        else:
+            self.stats["reused"] += 1
+            if time.monotonic() - released_at > self.validate_after:
+                self.stats["validated"] += 1
+                if not self._validate(conn):
+                    # Replace the connection in the same slot
+                    _close(conn)
+                    self.stats["discarded"] += 1
+                    conn = self._new_connection()
+        try:
+            yield conn
+        except BaseException:
+            self._forget(conn)
+            raise
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                _close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            _close(conn)
+
+
+def _close(conn):
+    # prestodb's Connection.close() is a no-op; the HTTP session holds the sockets
+    conn.close()
+    conn._http_session.close()
@@ -0,0 +1,146 @@
+"""
+Recall check for Presto's approx_nearest_neighbors
+Exports the table's embeddings to a local memory-mapped file, computes exact
+top-k with milvus_library.groundTruth and compares it to the JVector results
+for a sample of stored vectors used as queries.
+
+    python recall_eval.py --host localhost --port 8080 --user admin \\
+        --catalog iceberg --schema review_vectors --table reviews_embeddings --queries 200 --k 10
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import prestodb
+import urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+try:
+    from milvus_library.groundTruth import ExactSearch, recall_at_k
+except ImportError:
+    # Fall back to the milvus_library sources checked out next to this tutorial
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "milvus_library"))
+    from milvus_library.groundTruth import ExactSearch, recall_at_k
+
+
+def connect(args):
+    """Create Presto connection with optional basic authentication"""
+    conn_params = {
+        'host': args.host,
+        'port': args.port,
+        'user': args.user,
+        'catalog': args.catalog,
+        'schema': args.schema,
+        'http_scheme': args.http_scheme,
+    }
+    if args.password:
+        conn_params['auth'] = prestodb.auth.BasicAuthentication(args.user, args.password)
+    conn = prestodb.dbapi.connect(**conn_params)
+    if args.http_scheme == 'https':
+        conn._http_session.verify = False
+    return conn
+
+
+def export_embeddings(conn, args, workdir: Path):
+    """Stream row_id/embedding pairs into workdir/vectors.npy (memory-mapped) and workdir/row_ids.npy"""
+    table = f"{args.catalog}.{args.schema}.{args.table}"
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT count(*), max(cardinality({args.embedding_column})) FROM {table}")
+    count, dim = cursor.fetchone()
+    cursor.close()
+
+    vectors = np.lib.format.open_memmap(workdir / "vectors.npy", mode="w+", dtype=np.float32, shape=(count, dim))
+    row_ids = np.empty(count, dtype=np.int64)
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT row_id, {args.embedding_column} FROM {table}")
+    position = 0
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            break
+        # Rows appended since the count query are ignored
+        rows = rows[:count - position]
+        row_ids[position:position + len(rows)] = [row[0] for row in rows]
+        vectors[position:position + len(rows)] = np.asarray([row[1] for row in rows], dtype=np.float32)
+        position += len(rows)
+        if position >= count:
+            break
+    cursor.close()
+    vectors.flush()
+    np.save(workdir / "row_ids.npy", row_ids[:position])
+    return np.load(workdir / "vectors.npy", mmap_mode="r")[:position], row_ids[:position]
+
+
+def approx_search(conn, args, vector: np.ndarray):
+    """Row ids returned by approx_nearest_neighbors for one query vector"""
+    vector_str = ",".join(map(str, vector.tolist()))
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    SELECT *
+    FROM {args.catalog}.system.approx_nearest_neighbors(
+        CAST(ARRAY[{vector_str}] AS array(real)),
+        '{args.schema}.{args.table}.{args.embedding_column}',
+        {args.k}
+    )
+    """)
+    ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure recall@k of approx_nearest_neighbors against exact search.')
+    parser.add_argument('--host', required=True)
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', default='')
+    parser.add_argument('--http-scheme', default='http', choices=['http', 'https'])
+    parser.add_argument('--catalog', default='iceberg')
+    parser.add_argument('--schema', required=True)
+    parser.add_argument('--table', required=True)
+    parser.add_argument('--embedding-column', default='embedding')
+    parser.add_argument('--metric', default='COSINE', choices=['L2', 'IP', 'COSINE'])
+    parser.add_argument('--queries', type=int, default=100, help='Stored vectors sampled as queries')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--workdir', default='recall_eval', help='Directory for the exported vectors')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+    conn = connect(args)
+
+    print('Exporting embeddings...')
+    vectors, row_ids = export_embeddings(conn, args, workdir)
+    print(f'  {len(vectors)} vectors of dimension {vectors.shape[1]}')
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False))
+    queries = np.asarray(vectors[sample])
+
+    print('Computing exact top-k...')
+    start = time.time()
+    truth_positions, _ = ExactSearch(vectors, args.metric).search(queries, args.k)
+    truth = row_ids[truth_positions]
+    print(f'  done in {time.time() - start:.2f}s')
+
+    print('Running approx_nearest_neighbors...')
+    found = np.full((len(queries), args.k), -1, dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.time()
+        ids = approx_search(conn, args, query)[:args.k]
+        latencies.append(time.time() - start)
+        found[i, :len(ids)] = ids
+
+    print(f'\nrecall@{args.k}: {recall_at_k(found, truth):.4f}')
+    print(f'p50 latency: {np.percentile(latencies, 50) * 1000:.1f} ms, '
+          f'p95 latency: {np.percentile(latencies, 95) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Search-result cache for the Presto JVector tutorial
+Remembers the results of identical searches per table and serves them until
+the table's current Iceberg snapshot changes, which is read from the main
+branch in the "table$refs" metadata table, or from "table$snapshots" on
+Iceberg connectors without $refs. Memory use is capped by an estimate of the
+cached results' size, with least-recently-used eviction.
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# How long a looked-up snapshot id is trusted before the metadata table is queried again
+DEFAULT_SNAPSHOT_TTL_S = 5.0
+
+
+def _first_value(conn, sql: str) -> Optional[int]:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        return rows[0][0] if rows else None
+    finally:
+        cursor.close()
+
+
+def current_snapshot_id(conn, catalog: str, schema: str, table: str) -> Optional[int]:
+    """
+    Id of the snapshot the table's main branch points at, or None for a table
+    without snapshots. Unlike the newest entry in $snapshots, this follows
+    rollbacks and cherry-picks.
+
+    Older Presto Iceberg connectors have no $refs table; there the id of the
+    most recently committed snapshot is used instead.
+    """
+    try:
+        return _first_value(conn, f"""
+        SELECT snapshot_id
+        FROM {catalog}.{schema}."{table}$refs"
+        WHERE name = 'main' AND type = 'BRANCH'
+        """)
+    except Exception:
+        return _first_value(conn, f"""
+        SELECT snapshot_id
+        FROM {catalog}.{schema}."{table}$snapshots"
+        ORDER BY committed_at DESC
+        LIMIT 1
+        """)
+
+
+def table_key(settings, table: str) -> str:
+    """
+    Cache scope for a table as seen by one Presto endpoint and user, from a
+    presto_pool.ConnectionSettings; the same table name on another host or
+    for another user is cached separately.
+    """
+    return (f"{settings.http_scheme}://{settings.user}@{settings.host}:{settings.port}/"
+            f"{settings.catalog}.{settings.schema}.{table}")
+
+
+def vector_key(vector) -> str:
+    """Short digest of a query vector's bytes, for use in cache keys"""
+    return hashlib.blake2b(memoryview(vector).cast("B"), digest_size=16).hexdigest()
+
+
+def _result_size(results: List[tuple]) -> int:
+    size = sys.getsizeof(results)
+    for row in results:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class ResultCache:
+    """
+    LRU cache of search results, invalidated per table by snapshot id.
+
+    get_or_search(table, key, snapshot, search) returns the results stored for
+    (table, key) if they were computed at the snapshot snapshot() reports now,
+    and otherwise calls search() and stores its results. `table` should come
+    from table_key(), so that results are never shared across connections.
+    Empty results are not stored, since the search helpers also return []
+    after a reported error.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, snapshot_ttl_s: float = DEFAULT_SNAPSHOT_TTL_S):
+        self.max_bytes = max_bytes
+        self.snapshot_ttl_s = snapshot_ttl_s
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[List[tuple], int]]" = OrderedDict()
+        self._snapshots: Dict[str, Tuple[Optional[int], float]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _drop(self, entry_key):
+        _, size = self._entries.pop(entry_key)
+        self._bytes -= size
+
+    def _invalidate_table(self, table: str):
+        for entry_key in [k for k in self._entries if k[0] == table]:
+            self._drop(entry_key)
+            self.stats["invalidations"] += 1
+
+    def _current_snapshot(self, table: str, snapshot: Callable[[], Optional[int]]) -> Optional[int]:
+        with self._lock:
+            known = self._snapshots.get(table)
+        if known is not None and time.monotonic() - known[1] < self.snapshot_ttl_s:
+            return known[0]
+        snapshot_id = snapshot()
+        with self._lock:
+            if known is not None and known[0] != snapshot_id:
+                self._invalidate_table(table)
+            self._snapshots[table] = (snapshot_id, time.monotonic())
+        return snapshot_id
+
+    def get_or_search(self, table: str, key: Hashable, snapshot: Callable[[], Optional[int]],
+                      search: Callable[[], List[tuple]]) -> List[tuple]:
+        snapshot_id = self._current_snapshot(table, snapshot)
+        entry_key = (table, (snapshot_id, key))
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                self.stats["hits"] += 1
+                return entry[0]
+            self.stats["misses"] += 1
+
+        results = search()
+        if not results:
+            return results
+        size = _result_size(results)
+        if size > self.max_bytes:
+            return results
+        with self._lock:
+            if entry_key in self._entries:
+                self._drop(entry_key)
+            self._entries[entry_key] = (results, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._snapshots.clear()
+            self._bytes = 0
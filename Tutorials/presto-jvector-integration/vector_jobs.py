@@ -0,0 +1,413 @@
+"""
+Headless ingestion, indexing and search for the Presto JVector tutorial
+The steps behind the Streamlit app as plain functions, plus a command line for
+batch jobs, profiling and load tests:
+
+    python vector_jobs.py ingest --host localhost --user admin --schema review_vectors \\
+        --table reviews_embeddings --csv reviews.csv --column review \\
+        --location s3a://bucket/review_vectors --checkpoint reviews.ckpt.json
+    python vector_jobs.py index --host localhost --user admin --schema review_vectors --table reviews_embeddings
+    python vector_jobs.py search --host localhost --user admin --schema review_vectors \\
+        --table reviews_embeddings --query "great battery life" --k 5
+    python vector_jobs.py bench --host localhost --user admin --schema review_vectors \\
+        --table reviews_embeddings --queries queries.txt --workers 8 --repeat 3
+
+An ingest with --checkpoint records the chunks committed so far; running the
+same command again continues after the last committed chunk.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import urllib3
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+import bulk_loader
+import embedding_backends
+import ingest_pipeline
+import presto_pool
+import result_cache
+import vector_search
+from embedding_cache import EmbeddingCache, vector_literal
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _execute(conn, sql: str):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def create_schema(conn, catalog: str, schema: str, location: str):
+    _execute(conn, f"""
+    CREATE SCHEMA IF NOT EXISTS {catalog}.{schema}
+    WITH (location = '{location}')
+    """)
+
+
+def create_table(conn, catalog: str, schema: str, table: str, text_column: str, embedding_column: str):
+    _execute(conn, f"""
+    CREATE TABLE IF NOT EXISTS {catalog}.{schema}.{table} (
+        row_id BIGINT,
+        {text_column} VARCHAR,
+        {embedding_column} ARRAY(REAL)
+    )
+    """)
+
+
+def create_vector_index(conn, catalog: str, schema: str, table: str, embedding_column: str):
+    _execute(conn, f"CALL {catalog}.system.CREATE_VEC_INDEX('{catalog}.{schema}.{table}.{embedding_column}')")
+
+
+def insert_rows(conn, catalog: str, schema: str, table: str, text_column: str, embedding_column: str,
+                row_ids, texts: List[str], embeddings: np.ndarray, batch_size: int = 100,
+                progress: Optional[Callable[[int], None]] = None):
+    """INSERT ... VALUES in batches of batch_size rows; progress(rows_done) is called after each batch"""
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(texts), batch_size):
+            stop = start + batch_size
+            cursor.execute(ingest_pipeline.values_insert_sql(
+                catalog, schema, table, text_column, embedding_column,
+                row_ids[start:stop], texts[start:stop], embeddings[start:stop]
+            ))
+            cursor.fetchall()
+            if progress is not None:
+                progress(min(stop, len(texts)))
+    finally:
+        cursor.close()
+
+
+def bulk_writer(catalog: str, schema: str, table: str, text_column: str, embedding_column: str,
+                staging_location: str, s3: bulk_loader.S3Config, staging_catalog: str = "hive",
+                staging_schema: Optional[str] = None) -> Callable:
+    """A write(conn, row_ids, texts, embeddings) callable that loads each chunk through Parquet staging"""
+    def write(conn, row_ids, texts, embeddings):
+        bulk_loader.bulk_load(
+            conn, [bulk_loader.record_batch(row_ids, texts, embeddings, text_column, embedding_column)],
+            catalog, schema, table, text_column, embedding_column, staging_location, s3, staging_catalog,
+            staging_schema=staging_schema
+        )
+    return write
+
+
+class IngestCheckpoint:
+    """
+    JSON file recording how far an ingest got.
+
+    Writers finish chunks out of order, so the file holds the watermark below
+    which every chunk is committed (next_chunk) and the last row id of those
+    chunks. It also stores the job description, so a checkpoint is never
+    applied to a different source, column, chunk size or table.
+    """
+
+    def __init__(self, path: str, job: Dict):
+        self.path = path
+        self.job = job
+        self.next_chunk = 0
+        self.last_row_id = 0
+        self.complete = False
+        self._done: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.resumed = os.path.exists(path)
+        if self.resumed:
+            with open(path) as f:
+                state = json.load(f)
+            if state["job"] != job:
+                raise ValueError(f"Checkpoint {path} belongs to a different ingest job: {state['job']}")
+            self.next_chunk = state["next_chunk"]
+            self.last_row_id = state["last_row_id"]
+            self.complete = state.get("complete", False)
+
+    def mark(self, chunk_index: int, row_ids: np.ndarray):
+        with self._lock:
+            self._done[chunk_index] = int(row_ids[-1]) if len(row_ids) else -1
+            advanced = False
+            while self.next_chunk in self._done:
+                last = self._done.pop(self.next_chunk)
+                if last >= 0:
+                    self.last_row_id = last
+                self.next_chunk += 1
+                advanced = True
+            if advanced:
+                self.save()
+
+    def finish(self):
+        with self._lock:
+            self.complete = True
+            self.save()
+
+    def save(self):
+        state = {"job": self.job, "next_chunk": self.next_chunk, "last_row_id": self.last_row_id,
+                 "complete": self.complete, "updated_at": time.time()}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+
+def ingest(settings: presto_pool.ConnectionSettings, encode: Callable[[List[str]], np.ndarray], source, column: str,
+           table: str, text_column: str, embedding_column: str, location: Optional[str] = None,
+           max_rows: Optional[int] = None, chunk_rows: int = 1000, insert_batch_size: int = 100, writers: int = 4,
+           write: Optional[Callable] = None, checkpoint_path: Optional[str] = None, create: bool = True,
+           progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Stream one CSV column into the table with ingest_pipeline.IngestPipeline.
+
+    With create, the schema (when location is given) and table are created
+    first. With checkpoint_path, committed chunks are recorded there and an
+    interrupted ingest resumes after the last one; rows that writers had
+    already inserted past that point are deleted first, since their chunks
+    were not recorded and will be written again.
+    """
+    catalog, schema = settings.catalog, settings.schema
+    conn = settings.connect()
+    try:
+        if create:
+            if location:
+                create_schema(conn, catalog, schema, location)
+            create_table(conn, catalog, schema, table, text_column, embedding_column)
+
+        checkpoint = None
+        if checkpoint_path:
+            job = {"source": str(source), "column": column, "max_rows": max_rows, "chunk_rows": chunk_rows,
+                   "table": f"{catalog}.{schema}.{table}"}
+            checkpoint = IngestCheckpoint(checkpoint_path, job)
+            if checkpoint.complete:
+                return {"rows": 0, "elapsed_s": 0.0, "rows_per_s": 0.0, "stages": [],
+                        "resumed_from_chunk": checkpoint.next_chunk, "complete": True}
+            # Written before any insert, so a rerun knows the job had started
+            checkpoint.save()
+            if checkpoint.resumed:
+                _execute(conn, f"DELETE FROM {catalog}.{schema}.{table} WHERE row_id > {checkpoint.last_row_id}")
+    finally:
+        conn.close()
+
+    pipeline = ingest_pipeline.IngestPipeline(
+        settings.connect, encode, catalog, schema, table, text_column, embedding_column,
+        chunk_rows=chunk_rows, insert_batch_size=insert_batch_size, writers=writers, write=write,
+        on_written=checkpoint.mark if checkpoint else None
+    )
+    start_chunk = checkpoint.next_chunk if checkpoint else 0
+    summary = pipeline.run(source, column, max_rows=max_rows, progress=progress, start_chunk=start_chunk)
+    if checkpoint:
+        checkpoint.finish()
+    summary["resumed_from_chunk"] = start_chunk
+    return summary
+
+
+def search(pool: presto_pool.PrestoConnectionPool, encode: Callable[[List[str]], np.ndarray], text: str,
+           table: str, top_k: int = 10, text_column: str = "comment", embedding_column: str = "embedding",
+           filter_sql: Optional[str] = None, query_cache: Optional[EmbeddingCache] = None,
+           model_key: str = DEFAULT_MODEL, results: Optional[result_cache.ResultCache] = None):
+    """
+    (row_id, text, score) tuples for one query text.
+
+    With query_cache, the query embedding is reused per (model_key, text).
+    With results, whole result lists are reused until the table's main branch
+    moves to another snapshot.
+    """
+    def encode_one(query: str) -> np.ndarray:
+        return np.asarray(encode([query]), dtype=np.float32)[0]
+
+    vector = query_cache.get_or_encode(model_key, text, encode_one) if query_cache is not None else encode_one(text)
+    settings = pool.settings
+
+    def run() -> List[tuple]:
+        with pool.acquire() as conn:
+            return vector_search.search(conn, settings.catalog, settings.schema, table, vector_literal(vector),
+                                        top_k, text_column, embedding_column, filter_sql)
+
+    if results is None:
+        return run()
+
+    def snapshot() -> Optional[int]:
+        with pool.acquire() as conn:
+            return result_cache.current_snapshot_id(conn, settings.catalog, settings.schema, table)
+
+    key = (embedding_column, text_column, top_k, filter_sql or "", result_cache.vector_key(vector))
+    return results.get_or_search(result_cache.table_key(settings, table), key, snapshot, run)
+
+
+def benchmark_search(pool: presto_pool.PrestoConnectionPool, encode: Callable[[List[str]], np.ndarray],
+                     queries: List[str], table: str, top_k: int = 10, text_column: str = "comment",
+                     embedding_column: str = "embedding", workers: int = 8, repeat: int = 1) -> dict:
+    """Encode throughput, per-query search latency percentiles and QPS at the given concurrency"""
+    start = time.perf_counter()
+    vectors = np.asarray(encode(queries), dtype=np.float32)
+    encode_s = time.perf_counter() - start
+    literals = [vector_literal(v) for v in vectors] * repeat
+
+    def timed(literal: str) -> float:
+        started = time.perf_counter()
+        with pool.acquire() as conn:
+            vector_search.search(conn, pool.settings.catalog, pool.settings.schema, table, literal, top_k,
+                                 text_column, embedding_column)
+        return time.perf_counter() - started
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = np.array(list(executor.map(timed, literals)))
+    wall_s = time.perf_counter() - start
+    return {
+        "queries": len(literals),
+        "workers": workers,
+        "encode_per_s": round(len(queries) / encode_s, 1) if encode_s else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 1),
+        "qps": round(len(literals) / wall_s, 1),
+    }
+
+
+def load_encoder(model_name: str = DEFAULT_MODEL, backend: str = "torch") -> Callable[[List[str]], np.ndarray]:
+    """encode(texts) for a SentenceTransformer model on one of embedding_backends.BACKENDS, normalized"""
+    model = embedding_backends.load_backend(model_name, backend)
+    return lambda texts: model.encode(texts, show_progress_bar=False, normalize_embeddings=True)
+
+
+class _Encoder:
+    """Adapts an encode(texts) callable to the model.encode interface batch_search expects"""
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray]):
+        self._encode = encode
+
+    def encode(self, texts, batch_size: Optional[int] = None, **kwargs):
+        texts = list(texts)
+        if not batch_size or len(texts) <= batch_size:
+            return self._encode(texts)
+        return np.concatenate([self._encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+
+
+def _settings(args) -> presto_pool.ConnectionSettings:
+    return presto_pool.ConnectionSettings(
+        args.host, args.port, args.user, args.catalog, args.schema, args.http_scheme,
+        args.user, args.password, disable_ssl_verification=True
+    )
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--host', required=True)
+    common.add_argument('--port', type=int, default=8080)
+    common.add_argument('--user', required=True)
+    common.add_argument('--password', default='')
+    common.add_argument('--http-scheme', default='http', choices=['http', 'https'])
+    common.add_argument('--catalog', default='iceberg')
+    common.add_argument('--schema', required=True)
+    common.add_argument('--table', required=True)
+    common.add_argument('--text-column', default='comment')
+    common.add_argument('--embedding-column', default='embedding')
+    common.add_argument('--backend', default='torch', choices=embedding_backends.BACKENDS,
+                        help='Embedding inference backend')
+
+    parser = argparse.ArgumentParser(description='Headless ingestion, indexing and search for Presto JVector tables.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest_cmd = commands.add_parser('ingest', parents=[common], help='Embed a CSV column and insert it')
+    ingest_cmd.add_argument('--csv', required=True)
+    ingest_cmd.add_argument('--column', required=True, help='CSV column to embed')
+    ingest_cmd.add_argument('--location', default=None, help='Schema location, e.g. s3a://bucket/schema')
+    ingest_cmd.add_argument('--max-rows', type=int, default=None)
+    ingest_cmd.add_argument('--chunk-rows', type=int, default=1000)
+    ingest_cmd.add_argument('--batch-size', type=int, default=100, help='Rows per INSERT statement')
+    ingest_cmd.add_argument('--writers', type=int, default=4)
+    ingest_cmd.add_argument('--checkpoint', default=None, help='JSON file to record progress and resume from')
+    ingest_cmd.add_argument('--no-index', action='store_true', help='Skip creating the vector index')
+    ingest_cmd.add_argument('--model', default=DEFAULT_MODEL)
+    ingest_cmd.add_argument('--encode-workers', type=int, default=1,
+                            help='Encoding processes, each with its own model copy')
+
+    commands.add_parser('index', parents=[common], help='Create the vector index')
+
+    search_cmd = commands.add_parser('search', parents=[common], help='Search one or more query texts')
+    search_cmd.add_argument('--query', action='append', default=[], help='Query text; may be repeated')
+    search_cmd.add_argument('--queries', default=None, help='File with one query per line')
+    search_cmd.add_argument('--k', type=int, default=10)
+    search_cmd.add_argument('--filter', default=None, help='SQL condition on the table columns (alias t)')
+    search_cmd.add_argument('--workers', type=int, default=8)
+    search_cmd.add_argument('--output', default=None, help='Write all hits to a .parquet or .csv file')
+    search_cmd.add_argument('--model', default=DEFAULT_MODEL)
+
+    bench_cmd = commands.add_parser('bench', parents=[common], help='Measure search latency and throughput')
+    bench_cmd.add_argument('--queries', required=True, help='File with one query per line')
+    bench_cmd.add_argument('--k', type=int, default=10)
+    bench_cmd.add_argument('--workers', type=int, default=8)
+    bench_cmd.add_argument('--repeat', type=int, default=1, help='Times to run each query')
+    bench_cmd.add_argument('--model', default=DEFAULT_MODEL)
+
+    args = parser.parse_args(argv)
+    settings = _settings(args)
+
+    if args.command == 'index':
+        conn = settings.connect()
+        create_vector_index(conn, args.catalog, args.schema, args.table, args.embedding_column)
+        conn.close()
+        print(f'Vector index created on {args.catalog}.{args.schema}.{args.table}.{args.embedding_column}')
+        return
+
+    if args.command == 'ingest':
+        encoder = None
+        if args.encode_workers > 1:
+            import parallel_encoder
+            encoder = parallel_encoder.ParallelEncoder(args.model, args.backend, workers=args.encode_workers)
+            encode = encoder.encode
+        else:
+            encode = load_encoder(args.model, args.backend)
+
+        def report(metrics):
+            print(f"  {metrics['rows']} rows, {metrics['rows_per_s']} rows/s", flush=True)
+
+        try:
+            summary = ingest(settings, encode, args.csv, args.column, args.table, args.text_column,
+                             args.embedding_column, args.location, args.max_rows, args.chunk_rows, args.batch_size,
+                             args.writers, checkpoint_path=args.checkpoint, progress=report)
+        finally:
+            if encoder is not None:
+                encoder.close()
+        print(json.dumps(summary, indent=2))
+        if not args.no_index:
+            conn = settings.connect()
+            create_vector_index(conn, args.catalog, args.schema, args.table, args.embedding_column)
+            conn.close()
+        return
+
+    import batch_search
+
+    encode = load_encoder(args.model, args.backend)
+
+    pool = presto_pool.PrestoConnectionPool(settings, size=args.workers)
+    try:
+        queries = list(args.query) + (batch_search.read_queries(args.queries) if args.queries else [])
+        if args.command == 'search':
+            if not queries:
+                parser.error('search needs --query or --queries')
+            results = batch_search.batch_search(pool, _Encoder(encode), queries, args.table, args.k, args.text_column,
+                                                args.embedding_column, args.filter, args.workers)
+            if args.output:
+                batch_search.write_results(results, args.output)
+                print(f'{len(results)} hits written to {args.output}')
+            else:
+                for row in results.itertuples(index=False):
+                    print(f'[{row.query_index}] #{row.rank} row_id={row.row_id} score={row.score:.4f}  {row.text}')
+        else:
+            print(json.dumps(benchmark_search(pool, encode, queries, args.table, args.k, args.text_column,
+                                              args.embedding_column, args.workers, args.repeat), indent=2))
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
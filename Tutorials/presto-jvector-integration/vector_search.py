@@ -0,0 +1,80 @@
+"""
+Single-round-trip vector search for the Presto JVector tutorial
+Joins the row ids returned by approx_nearest_neighbors with the base table in
+one query, so the text comes back with the ids instead of through a second
+SELECT ... WHERE row_id IN (...), and computes a similarity score per hit.
+"""
+
+from typing import List, Optional, Tuple
+
+# Candidates fetched from the index per requested result when a filter is given,
+# since the filter is applied to the joined rows after the ANN lookup
+DEFAULT_FILTER_OVERSAMPLE = 4
+# search() widens the candidate set up to this many when a filter leaves fewer than top_k rows
+DEFAULT_MAX_CANDIDATES = 4096
+
+
+def search_sql(catalog: str, schema: str, table: str, vector_str: str, top_k: int,
+               text_column: str = "comment", embedding_column: str = "embedding",
+               filter_sql: Optional[str] = None, candidates: Optional[int] = None) -> str:
+    """
+    ANN lookup joined with the base table, best match first.
+
+    The score is the inner product of the stored and query vectors, which is
+    the cosine similarity for the normalized embeddings this app writes.
+    filter_sql is a boolean expression over the table's columns (alias t),
+    e.g. "t.row_id > 1000". It is applied to the `candidates` nearest
+    neighbours (default top_k, or top_k * DEFAULT_FILTER_OVERSAMPLE with a
+    filter), so a selective filter can leave fewer than top_k rows.
+
+    The vector is inlined as the table function's argument, since Presto only
+    takes constant expressions there; the `query` CTE is for the score.
+    """
+    if candidates is None:
+        candidates = top_k * DEFAULT_FILTER_OVERSAMPLE if filter_sql else top_k
+    where = f"WHERE {filter_sql}" if filter_sql else ""
+    vector = f"CAST(ARRAY[{vector_str}] AS array(real))"
+    return f"""
+    WITH query AS (
+        SELECT {vector} AS vector
+    )
+    SELECT t.row_id,
+           t.{text_column},
+           reduce(zip_with(t.{embedding_column}, query.vector, (a, b) -> a * b), 0.0E0, (s, x) -> s + x, s -> s) AS score
+    FROM {catalog}.system.approx_nearest_neighbors(
+        {vector},
+        '{schema}.{table}.{embedding_column}',
+        {candidates}
+    ) AS ann (row_id)
+    JOIN {catalog}.{schema}.{table} t ON t.row_id = ann.row_id
+    CROSS JOIN query
+    {where}
+    ORDER BY score DESC
+    LIMIT {top_k}
+    """
+
+
+def search(conn, catalog: str, schema: str, table: str, vector_str: str, top_k: int,
+           text_column: str = "comment", embedding_column: str = "embedding",
+           filter_sql: Optional[str] = None,
+           max_candidates: int = DEFAULT_MAX_CANDIDATES) -> List[Tuple[int, str, float]]:
+    """
+    Run search_sql on conn and return (row_id, text, score) tuples.
+
+    With a filter, the candidate set is widened (4x per retry) until top_k rows
+    pass it or max_candidates neighbours have been checked. Fewer than top_k
+    tuples therefore means no more matches among the max_candidates nearest
+    rows; callers that need to tell should compare len() with top_k.
+    """
+    candidates = top_k * DEFAULT_FILTER_OVERSAMPLE if filter_sql else top_k
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(search_sql(catalog, schema, table, vector_str, top_k, text_column, embedding_column,
+                                      filter_sql, candidates))
+            rows = [(row[0], row[1], float(row[2])) for row in cursor.fetchall()]
+            if not filter_sql or len(rows) >= top_k or candidates >= max_candidates:
+                return rows
+            candidates = min(candidates * DEFAULT_FILTER_OVERSAMPLE, max_candidates)
+    finally:
+        cursor.close()
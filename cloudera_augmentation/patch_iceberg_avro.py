@@ -11,6 +11,7 @@ Handles both:
     manifest_length to match the new byte size of the rewritten manifest files
 
 Must be run AFTER rewriting .metadata.json files with sed, and BEFORE uploading to Ceph.
+relocate_iceberg_table.py runs all of these steps, including the upload, in one go.
 
 Usage:
     pip install fastavro
@@ -18,12 +19,38 @@ Usage:
     python3 patch_iceberg_avro.py \\
       --table-dir /root/<staging_dir>/<table_name> \\
       --old-prefix "hdfs://<HDFS_NAMENODE>/<hdfs_table_path>" \\
-      --new-prefix "s3a://<YOUR_BUCKET_NAME>/<destination_path>/<table_name>"
+      --new-prefix "s3a://<YOUR_BUCKET_NAME>/<destination_path>/<table_name>" \\
+      --workers 8
+
+Manifest files are independent of each other, so --workers N rewrites them in
+N processes. The manifest lists are patched once every manifest size is known.
+
+By default every string in every record is patched. With --targeted, only the
+Iceberg path fields (data_file.file_path, data_file.referenced_data_file of
+delete files, and manifest_path) are rewritten, and only where they start with
+the old prefix; partition values, bounds and column stats are left untouched.
+
+Progress is journaled next to the table directory, in <table-dir>.patch_journal
+(SQLite): the input hash, output hash, output size and status of every file.
+Rerunning the same command after a crash skips the files already patched and
+takes their sizes from the journal, so manifest_length is still correct. The
+journal stays out of the table directory, so the whole directory can be
+uploaded as is; delete the journal once the migration is done.
 """
 
 import argparse
+import functools
+import hashlib
 import io
+import json
+import multiprocessing
+import os
+import sqlite3
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import fastavro
 from pathlib import Path
 
@@ -52,15 +79,7 @@ def patch_snap_record(record, old, new, transformed_sizes):
         if isinstance(value, str):
             result[key] = value.replace(old, new)
         elif key == 'manifest_length' and isinstance(value, int):
-            # Look up new size of the already-patched manifest file
-            manifest_path = record.get('manifest_path', '')
-            filename = Path(manifest_path).name
-            new_size = transformed_sizes.get(filename)
-            if new_size is not None and new_size != value:
-                print(f'    manifest_length: {filename}  {value} → {new_size} bytes')
-                result[key] = new_size
-            else:
-                result[key] = value
+            result[key] = new_manifest_length(record.get('manifest_path', ''), value, transformed_sizes)
         elif isinstance(value, dict):
             result[key] = patch_value(value, old, new)
         elif isinstance(value, list):
@@ -70,35 +89,401 @@ def patch_snap_record(record, old, new, transformed_sizes):
     return result
 
 
-def rewrite_avro_file(path: Path, record_fn) -> int:
-    """Read, transform, and overwrite a local Avro file. Returns new byte size."""
-    raw = path.read_bytes()
-    reader = fastavro.reader(io.BytesIO(raw))
-    schema = reader.writer_schema
-    records = list(reader)
+def new_manifest_length(manifest_path, length, transformed_sizes):
+    """New size of the already-patched manifest file, or length if it wasn't rewritten."""
+    filename = Path(manifest_path).name
+    new_size = transformed_sizes.get(filename)
+    if new_size is not None and new_size != length:
+        print(f'    manifest_length: {filename}  {length} → {new_size} bytes')
+        return new_size
+    return length
+
+
+# Iceberg spec field ids of the fields that hold file locations
+PATH_FIELDS = {
+    100: 'file_path',             # data_file.file_path, data or delete file
+    143: 'referenced_data_file',  # data_file.referenced_data_file, v2+ delete files
+    500: 'manifest_path',         # manifest list entry
+}
+
+
+def _is_string(avro_type):
+    if isinstance(avro_type, list):
+        return any(_is_string(t) for t in avro_type)
+    if isinstance(avro_type, dict):
+        return avro_type.get('type') == 'string'
+    return avro_type == 'string'
+
+
+def _records(avro_type):
+    """Record schemas reachable directly (or through a union) from avro_type."""
+    if isinstance(avro_type, list):
+        return [r for t in avro_type for r in _records(t)]
+    if isinstance(avro_type, dict) and avro_type.get('type') == 'record':
+        return [avro_type]
+    return []
+
+
+def _find_path_fields(record_schema, prefix=()):
+    found = []
+    for field in record_schema.get('fields', []):
+        keys = prefix + (field['name'],)
+        field_id = field.get('field-id')
+        if field_id is not None:
+            is_path = PATH_FIELDS.get(field_id) == field['name']
+        else:
+            is_path = field['name'] in PATH_FIELDS.values()
+        if is_path and _is_string(field['type']):
+            found.append(keys)
+        for nested in _records(field['type']):
+            found.extend(_find_path_fields(nested, keys))
+    return found
+
+
+@functools.lru_cache(maxsize=64)
+def _path_fields(schema_json):
+    return tuple(_find_path_fields(json.loads(schema_json)))
+
+
+def path_fields(schema):
+    """Key paths of the Iceberg path fields in an Avro writer schema, e.g. ('data_file', 'file_path')."""
+    return _path_fields(json.dumps(schema, sort_keys=True))
+
+
+def compile_path_patcher(schema, old, new, transformed_sizes=None):
+    """
+    Build a record function for one writer schema that rewrites only its path
+    fields, and only where they start with old. With transformed_sizes, a
+    top-level manifest_length is updated as in patch_snap_record.
+    """
+    paths = path_fields(schema)
+    update_length = transformed_sizes is not None and any(
+        f['name'] == 'manifest_length' for f in schema.get('fields', [])
+    )
+
+    def patch(record):
+        for keys in paths:
+            target = record
+            for key in keys[:-1]:
+                target = target.get(key)
+                if target is None:
+                    break
+            else:
+                value = target.get(keys[-1])
+                if isinstance(value, str) and value.startswith(old):
+                    target[keys[-1]] = new + value[len(old):]
+        if update_length:
+            record['manifest_length'] = new_manifest_length(
+                record.get('manifest_path', ''), record['manifest_length'], transformed_sizes
+            )
+        return record
 
-    # Preserve original Avro codec
-    codec = 'deflate'
-    if reader.metadata:
-        raw_codec = reader.metadata.get(b'avro.codec') or reader.metadata.get('avro.codec')
-        if isinstance(raw_codec, bytes):
-            raw_codec = raw_codec.decode('utf-8', errors='ignore')
-        if raw_codec and raw_codec.strip():
-            codec = raw_codec.strip()
+    return patch
 
-    transformed = [record_fn(r) for r in records]
 
-    out = io.BytesIO()
+@functools.lru_cache(maxsize=None)
+def usable_codec(codec):
+    """codec if fastavro can write it here (e.g. snappy needs cramjam), else 'null'."""
     try:
-        fastavro.writer(out, schema, transformed, codec=codec)
+        fastavro.writer(io.BytesIO(), {'type': 'record', 'name': 'probe', 'fields': []}, [{}], codec=codec)
+        return codec
     except Exception:
-        # Fallback: write without specifying codec
-        out = io.BytesIO()
-        fastavro.writer(out, schema, transformed)
+        return 'null'
 
-    data = out.getvalue()
-    path.write_bytes(data)
-    return len(data)
+
+def rewrite_avro_file(path: Path, record_fn=None, compile_fn=None, on_written=None) -> int:
+    """
+    Stream a local Avro file through record_fn and replace it. Returns new byte size.
+    Transforms that depend on the schema pass compile_fn instead, which is called
+    with the writer schema and returns the record function. on_written(tmp_path, size)
+    is called once the new file is complete, just before it replaces the original.
+
+    Records are read, transformed and written one block at a time into a
+    temporary file next to the original, which is then renamed over it, so
+    memory stays flat however large the file is and a crash never leaves a
+    half-written file behind.
+    """
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+            reader = fastavro.reader(src)
+
+            # Preserve original Avro codec
+            codec = 'deflate'
+            if reader.metadata:
+                raw_codec = reader.metadata.get(b'avro.codec') or reader.metadata.get('avro.codec')
+                if isinstance(raw_codec, bytes):
+                    raw_codec = raw_codec.decode('utf-8', errors='ignore')
+                if raw_codec and raw_codec.strip():
+                    codec = raw_codec.strip()
+
+            schema = reader.writer_schema
+            transform = compile_fn(schema) if compile_fn is not None else record_fn
+            fastavro.writer(dst, schema, (transform(r) for r in reader), codec=usable_codec(codec))
+            dst.flush()
+            os.fsync(dst.fileno())
+            size = dst.tell()
+        if on_written is not None:
+            on_written(tmp, size)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return size
+
+
+JOURNAL_SUFFIX = '.patch_journal'
+
+
+def default_journal_path(table_dir) -> str:
+    """<table-dir>.patch_journal, beside the table directory so it is never uploaded with it."""
+    table_dir = Path(table_dir).resolve()
+    return str(table_dir.with_name(table_dir.name + JOURNAL_SUFFIX))
+
+
+def path_inside(path, directory) -> bool:
+    return Path(directory).resolve() in Path(path).resolve().parents
+
+
+def file_sha256(path: Path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MigrationJournal:
+    """
+    SQLite record of which Avro files a migration has rewritten.
+
+    Each rewrite stores the hash of its input, and the hash and size of its
+    output as status 'written' before the output replaces the input, then
+    'done' after. A file on disk whose hash matches its recorded output was
+    therefore patched, whatever the status; any other file still needs it.
+    Manifest workers in other processes share the journal through SQLite's
+    own locking; threads in one process share the connection under a lock.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=60, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, status TEXT, input_sha256 TEXT, '
+            'output_sha256 TEXT, output_size INTEGER, updated_at REAL)'
+        )
+        self._conn.commit()
+
+    def check_settings(self, old, new, targeted):
+        """Record the run's prefixes and mode, or raise ValueError if the journal is for another run."""
+        settings = {'old_prefix': old, 'new_prefix': new, 'mode': 'targeted' if targeted else 'all'}
+        for key, value in settings.items():
+            row = self._conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._conn.execute('INSERT INTO settings VALUES (?, ?)', (key, value))
+            elif row[0] != value:
+                raise ValueError(f'journal {self.path} was written with {key}={row[0]!r}, not {value!r}')
+        self._conn.commit()
+
+    # Files are keyed by name, which is unique within metadata/; callers journaling
+    # files elsewhere pass a key such as the path relative to the table dir.
+
+    def written(self, key, input_sha256, tmp: Path, size):
+        output_sha256 = file_sha256(tmp)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                (key, 'written', input_sha256, output_sha256, size, time.time())
+            )
+            self._conn.commit()
+
+    def done(self, key):
+        with self._lock:
+            self._conn.execute('UPDATE files SET status = ?, updated_at = ? WHERE name = ?',
+                               ('done', time.time(), key))
+            self._conn.commit()
+
+    def completed_size(self, path: Path, key=None):
+        """Output size if path is already patched, else None."""
+        key = key or path.name
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, output_sha256, output_size FROM files WHERE name = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, output_sha256, output_size = row
+        if file_sha256(path) == output_sha256:
+            if status != 'done':
+                self.done(key)
+            return output_size
+        if status == 'done':
+            print(f'  WARNING: {key} changed since it was patched, patching it again')
+        return None
+
+    def pending(self, paths, sizes):
+        """Paths still to patch; the sizes of the others are added to sizes."""
+        todo = []
+        for path in paths:
+            size = self.completed_size(path)
+            if size is None:
+                todo.append(path)
+            else:
+                sizes[path.name] = size
+        return todo
+
+    def close(self):
+        self._conn.close()
+
+
+@functools.lru_cache(maxsize=None)
+def open_journal(path) -> MigrationJournal:
+    """
+    The journal at path, opened once per process. SQLite connections must not
+    cross a fork, so worker pools use the spawn start method.
+    """
+    return MigrationJournal(path)
+
+
+def journaled(path: Path, journal_path, rewrite, key=None) -> int:
+    """
+    Run rewrite(path, on_written), which replaces path and returns its new size,
+    recording the input and output in the journal at journal_path if given.
+    """
+    if journal_path is None:
+        return rewrite(path, None)
+    journal = open_journal(journal_path)
+    key = key or path.name
+    input_sha256 = file_sha256(path)
+    size = rewrite(path, lambda tmp, size: journal.written(key, input_sha256, tmp, size))
+    journal.done(key)
+    return size
+
+
+def journaled_rewrite(path: Path, journal_path=None, record_fn=None, compile_fn=None) -> int:
+    """rewrite_avro_file, recording the input and output in the journal at journal_path if given."""
+    return journaled(path, journal_path, lambda p, on_written: rewrite_avro_file(p, record_fn, compile_fn, on_written))
+
+
+# Field id of the file_path column inside position delete files
+DELETE_FILE_PATH_ID = 2147483546
+
+
+def patch_delete_entry(record, old, new, delete_sizes):
+    """
+    Update a manifest entry for a position delete file that was itself rewritten
+    (see relocate_iceberg_table.py): file_size_in_bytes becomes its new size,
+    keyed by new path in delete_sizes, and the bounds of its file_path column
+    move to the new prefix. Bounds that can't be moved (truncated ones) are
+    dropped, which only costs some pruning.
+    """
+    data_file = record.get('data_file')
+    if not data_file or data_file.get('content') != 1:
+        return record
+    new_size = delete_sizes.get(data_file.get('file_path'))
+    if new_size is not None:
+        data_file['file_size_in_bytes'] = new_size
+    old_bytes, new_bytes = old.encode('utf-8'), new.encode('utf-8')
+    for name in ('lower_bounds', 'upper_bounds'):
+        bounds = data_file.get(name)
+        if not bounds:
+            continue
+        kept = []
+        for bound in bounds:
+            if bound['key'] == DELETE_FILE_PATH_ID:
+                value = bound['value']
+                if value.startswith(old_bytes):
+                    bound = {'key': bound['key'], 'value': new_bytes + value[len(old_bytes):]}
+                elif not value.startswith(new_bytes):
+                    continue
+            kept.append(bound)
+        data_file[name] = kept
+    return record
+
+
+def manifest_record_fn(schema, old, new, targeted=False, delete_sizes=None):
+    """Record function for manifest files with the given writer schema."""
+    patch = compile_path_patcher(schema, old, new) if targeted else functools.partial(patch_value, old=old, new=new)
+    if delete_sizes is None:
+        return patch
+    return lambda record: patch_delete_entry(patch(record), old, new, delete_sizes)
+
+
+def patch_manifest(path: Path, old, new, targeted=False, journal_path=None, delete_sizes=None):
+    """Patch one manifest file in place. Returns (file name, new byte size)."""
+    compile_fn = functools.partial(manifest_record_fn, old=old, new=new, targeted=targeted, delete_sizes=delete_sizes)
+    return path.name, journaled_rewrite(path, journal_path, compile_fn=compile_fn)
+
+
+def patch_manifest_list(path: Path, old, new, transformed_sizes, targeted=False, journal_path=None):
+    """Patch one manifest list file in place, updating manifest_length. Returns the new byte size."""
+    if targeted:
+        compile_fn = lambda schema: compile_path_patcher(schema, old, new, transformed_sizes)
+        return journaled_rewrite(path, journal_path, compile_fn=compile_fn)
+    return journaled_rewrite(path, journal_path, lambda r: patch_snap_record(r, old, new, transformed_sizes))
+
+
+def patch_manifests(manifest_files, old, new, workers=1, targeted=False, journal_path=None, delete_sizes=None):
+    """Patch manifest files, in `workers` processes if > 1. Returns {file name: new byte size}."""
+    transformed_sizes = {}
+    if workers <= 1:
+        for path in manifest_files:
+            print(f'Patching manifest: {path.name}')
+            name, new_size = patch_manifest(path, old, new, targeted, journal_path, delete_sizes)
+            transformed_sizes[name] = new_size
+            print(f'  Done — new size: {new_size} bytes')
+        return transformed_sizes
+
+    print(f'Patching {len(manifest_files)} manifest file(s) with {workers} workers')
+    # Hand out manifests in batches so tens of thousands of small files don't cost one round trip each
+    chunksize = max(1, len(manifest_files) // (workers * 8))
+    # spawn, so workers open their own journal connection instead of inheriting
+    # the parent's cached SQLite handle through fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        try:
+            results = pool.map(patch_manifest, manifest_files, repeat(old), repeat(new), repeat(targeted),
+                               repeat(journal_path), repeat(delete_sizes), chunksize=chunksize)
+            for done, (name, new_size) in enumerate(results, 1):
+                transformed_sizes[name] = new_size
+                if done % 1000 == 0 or done == len(manifest_files):
+                    print(f'  {done}/{len(manifest_files)} manifests patched')
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return transformed_sizes
+
+
+def patch_metadata_avro(metadata_dir: Path, old, new, workers=1, targeted=False, journal_path=None,
+                        delete_sizes=None) -> int:
+    """
+    Patch all manifests, then all manifest lists, in metadata_dir. Files the
+    journal at journal_path already records as patched are skipped. Returns
+    the number of Avro files.
+    """
+    avro_files = sorted(metadata_dir.glob('*.avro'))
+    manifest_files = [f for f in avro_files if not f.name.startswith('snap-')]
+    snap_files     = [f for f in avro_files if f.name.startswith('snap-')]
+    print(f'Found      : {len(manifest_files)} manifest file(s), {len(snap_files)} manifest list file(s)')
+
+    transformed_sizes = {}
+    if journal_path is not None:
+        journal = open_journal(journal_path)
+        manifest_files = journal.pending(manifest_files, transformed_sizes)
+        snap_files = journal.pending(snap_files, {})
+        print(f'Journal    : {journal_path}, {len(transformed_sizes)} manifest file(s) already patched')
+    print()
+
+    # Step 1 — patch manifest files first, capture new sizes
+    transformed_sizes.update(patch_manifests(manifest_files, old, new, workers, targeted, journal_path, delete_sizes))
+
+    # Step 2 — patch manifest list files, updating manifest_length
+    for path in snap_files:
+        print(f'Patching manifest list: {path.name}')
+        patch_manifest_list(path, old, new, transformed_sizes, targeted, journal_path)
+        print(f'  Done')
+    return len(avro_files)
 
 
 def main():
@@ -111,6 +496,13 @@ def main():
                         help='HDFS path prefix to replace, e.g. hdfs://namenode:8020/warehouse/.../table')
     parser.add_argument('--new-prefix', required=True,
                         help='S3A path prefix to replace with, e.g. s3a://bucket/warehouse/.../table')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to patch manifest files in parallel (default: 1)')
+    parser.add_argument('--targeted', action='store_true',
+                        help='Only rewrite Iceberg path fields (file_path, referenced_data_file, manifest_path)')
+    parser.add_argument('--journal', default=None,
+                        help=f'Journal file used to resume an interrupted run (default: <table-dir>{JOURNAL_SUFFIX})')
+    parser.add_argument('--no-journal', action='store_true', help='Do not record or resume progress')
     args = parser.parse_args()
 
     old = args.old_prefix
@@ -121,31 +513,31 @@ def main():
         print(f'ERROR: metadata directory not found: {metadata_dir}')
         sys.exit(1)
 
-    avro_files = sorted(metadata_dir.glob('*.avro'))
-    manifest_files = [f for f in avro_files if not f.name.startswith('snap-')]
-    snap_files     = [f for f in avro_files if f.name.startswith('snap-')]
-
     print(f'Table dir  : {args.table_dir}')
     print(f'Old prefix : {old}')
     print(f'New prefix : {new}')
-    print(f'Found      : {len(manifest_files)} manifest file(s), {len(snap_files)} manifest list file(s)\n')
+    print(f'Mode       : {"path fields only" if args.targeted else "all strings"}')
 
-    # Step 1 — patch manifest files first, capture new sizes
-    transformed_sizes = {}
-    for path in manifest_files:
-        print(f'Patching manifest: {path.name}')
-        new_size = rewrite_avro_file(path, lambda r: patch_value(r, old, new))
-        transformed_sizes[path.name] = new_size
-        print(f'  Done — new size: {new_size} bytes')
+    journal_path = None
+    if not args.no_journal:
+        journal_path = args.journal or default_journal_path(args.table_dir)
+        try:
+            open_journal(journal_path).check_settings(old, new, args.targeted)
+        except ValueError as e:
+            print(f'ERROR: {e}')
+            sys.exit(1)
 
-    # Step 2 — patch manifest list files, updating manifest_length
-    for path in snap_files:
-        print(f'Patching manifest list: {path.name}')
-        rewrite_avro_file(path, lambda r: patch_snap_record(r, old, new, transformed_sizes))
-        print(f'  Done')
+    try:
+        count = patch_metadata_avro(metadata_dir, old, new, args.workers, args.targeted, journal_path)
+    except Exception as e:
+        print(f'ERROR: failed to patch Avro files: {e}')
+        sys.exit(1)
 
-    print(f'\n✓ All {len(avro_files)} Avro files patched in place.')
-    print(f'  You can now upload the full table directory to Ceph.')
+    print(f'\n✓ All {count} Avro files patched in place.')
+    if journal_path and path_inside(journal_path, args.table_dir):
+        print(f'  You can now upload the full table directory to Ceph, without {Path(journal_path).name}.')
+    else:
+        print(f'  You can now upload the full table directory to Ceph.')
 
 
 if __name__ == '__main__':
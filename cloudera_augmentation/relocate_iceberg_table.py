@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+relocate_iceberg_table.py
+-------------------------
+Moves a local copy of an HDFS Iceberg table to S3-compatible storage (Ceph,
+MinIO, watsonx.data buckets) in one run, replacing the manual steps of
+rewriting .metadata.json with sed, running patch_iceberg_avro.py and
+uploading the directory by hand.
+
+Steps:
+  1. metadata/*.metadata.json: every location under the old prefix is moved
+     to the new prefix (table location, manifest lists, metadata log, ...)
+  2. Position delete files: the data file paths stored inside them are
+     rewritten (needs pyarrow). Equality delete files hold no paths.
+  3. Manifests and manifest lists: patched by patch_iceberg_avro, with the
+     new sizes of the rewritten delete files and manifests
+  4. Upload: every file under the table dir is uploaded to the new prefix by a
+     bounded pool of threads. Large files go up as multipart uploads whose
+     parts are spread over the pool. Each request carries a Content-MD5 that
+     the server checks, and failed requests are retried with backoff. A rerun
+     skips objects that already exist with the same size and content (SHA-256
+     metadata, or the multipart ETag), reading only the files it compares.
+
+Steps 1-3 share patch_iceberg_avro's journal, so rerunning the same command
+after a failure resumes where it stopped.
+
+Usage:
+    pip install fastavro boto3 pyarrow
+
+    python3 relocate_iceberg_table.py \\
+      --table-dir /root/<staging_dir>/<table_name> \\
+      --old-prefix "hdfs://<HDFS_NAMENODE>/<hdfs_table_path>" \\
+      --new-prefix "s3a://<YOUR_BUCKET_NAME>/<destination_path>/<table_name>" \\
+      --endpoint-url https://<CEPH_ENDPOINT> --access-key <KEY> --secret-key <SECRET> \\
+      --workers 8 --upload-workers 16
+
+--endpoint-url can point at a local MinIO or moto server for a dry run, and
+test_relocate_iceberg_table.py runs the upload against an in-process moto S3.
+Deletion vectors (v3 Puffin delete files) are not rewritten.
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import fastavro
+
+import patch_iceberg_avro as avro
+
+MB = 1024 * 1024
+DEFAULT_PART_SIZE = 64 * MB
+
+
+def move_prefix(value, old, new):
+    """value with a leading old prefix replaced by new; anything else unchanged."""
+    if isinstance(value, str) and value.startswith(old):
+        return new + value[len(old):]
+    if isinstance(value, dict):
+        return {k: move_prefix(v, old, new) for k, v in value.items()}
+    if isinstance(value, list):
+        return [move_prefix(v, old, new) for v in value]
+    return value
+
+
+def replace_file(path: Path, write_fn, on_written=None) -> int:
+    """Write path's new content with write_fn(tmp_path) and rename it over path. Returns the new size."""
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        write_fn(tmp)
+        with open(tmp, 'rb+') as f:
+            os.fsync(f.fileno())
+        size = tmp.stat().st_size
+        if on_written is not None:
+            on_written(tmp, size)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return size
+
+
+# Step 1 — metadata JSON
+
+def metadata_json_files(metadata_dir: Path):
+    return sorted(
+        p for p in metadata_dir.iterdir()
+        if p.name.endswith('.metadata.json') or p.name.endswith('.metadata.json.gz')
+    )
+
+
+def rewrite_metadata_json(path: Path, old, new, on_written=None) -> int:
+    """Move every location in a table metadata file to the new prefix. Returns the new size."""
+    compressed = path.name.endswith('.gz') or path.name.endswith('.gz.metadata.json')
+    opener = gzip.open if compressed else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    def write(tmp):
+        with opener(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(move_prefix(metadata, old, new), f, separators=(',', ':'))
+
+    return replace_file(path, write, on_written)
+
+
+# Step 2 — position delete files
+
+def position_delete_paths(manifest_files):
+    """file_path of every position delete file listed in the manifests (status is ignored)."""
+    paths = set()
+    for manifest in manifest_files:
+        with open(manifest, 'rb') as f:
+            for record in fastavro.reader(f):
+                data_file = record.get('data_file') or {}
+                if data_file.get('content') != 1:
+                    continue
+                if str(data_file.get('file_format', '')).upper() == 'PUFFIN':
+                    print(f'  WARNING: deletion vector {data_file["file_path"]} is not rewritten')
+                    continue
+                paths.add(data_file['file_path'])
+    return sorted(paths)
+
+
+def local_path(table_dir: Path, location, old, new):
+    """Local file for a table location under old or new, else None."""
+    for prefix in (old, new):
+        if location.startswith(prefix):
+            return table_dir / location[len(prefix):].lstrip('/')
+    return None
+
+
+def rewrite_position_delete_file(path: Path, old, new, on_written=None) -> int:
+    """
+    Move the data file paths inside a Parquet position delete file to the new
+    prefix, one row group at a time. Returns the new size; a file with no old
+    paths left is not rewritten.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    column = parquet_file.schema_arrow.get_field_index('file_path')
+    if column < 0:
+        raise ValueError(f'{path} has no file_path column; not a position delete file')
+    if not any(pc.any(pc.starts_with(parquet_file.read_row_group(i, columns=['file_path']).column(0), old)).as_py()
+               for i in range(parquet_file.num_row_groups)):
+        return path.stat().st_size
+    compression = 'snappy'
+    if parquet_file.num_row_groups:
+        compression = parquet_file.metadata.row_group(0).column(column).compression.lower()
+
+    def write(tmp):
+        with pq.ParquetWriter(tmp, parquet_file.schema_arrow, compression=compression) as writer:
+            for i in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(i)
+                paths = table.column(column)
+                moved = pc.if_else(
+                    pc.starts_with(paths, old),
+                    pc.binary_join_element_wise(new, pc.utf8_slice_codeunits(paths, len(old)), ''),
+                    paths
+                )
+                writer.write_table(table.set_column(column, table.field(column), moved))
+
+    return replace_file(path, write, on_written)
+
+
+def relocate_delete_files(table_dir: Path, manifest_files, old, new, workers=1, journal_path=None):
+    """Rewrite the position delete files. Returns {new location: new size} for patch_delete_entry."""
+    locations = position_delete_paths(manifest_files)
+    print(f'Found      : {len(locations)} position delete file(s)')
+    jobs = []
+    missing = []
+    for location in locations:
+        path = local_path(table_dir, location, old, new)
+        if path is None or not path.exists():
+            missing.append(location)
+            continue
+        jobs.append((move_prefix(location, old, new), path))
+    if missing:
+        print(f'  WARNING: {len(missing)} delete file(s) are not in the table dir and are left as they are, e.g.')
+        for location in missing[:5]:
+            print(f'    {location}')
+
+    def relocate(job):
+        new_location, path = job
+        key = path.relative_to(table_dir).as_posix()
+        journal = avro.open_journal(journal_path) if journal_path else None
+        size = journal.completed_size(path, key) if journal else None
+        if size is None:
+            size = avro.journaled(
+                path, journal_path, lambda p, on_written: rewrite_position_delete_file(p, old, new, on_written), key
+            )
+        return new_location, size
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(relocate, jobs))
+
+
+# Step 4 — upload
+
+def s3_client(endpoint_url=None, access_key=None, secret_key=None, region=None, verify_ssl=True, workers=16):
+    import boto3
+    from botocore.config import Config
+
+    options = {'retries': {'max_attempts': 3, 'mode': 'standard'}, 'max_pool_connections': workers}
+    try:
+        # Newer botocore adds CRC checksums to every request, which older Ceph releases reject;
+        # the uploads below send Content-MD5 instead
+        config = Config(request_checksum_calculation='when_required',
+                        response_checksum_validation='when_required', **options)
+    except TypeError:
+        config = Config(**options)
+    return boto3.client(
+        's3', endpoint_url=endpoint_url, aws_access_key_id=access_key, aws_secret_access_key=secret_key,
+        region_name=region, verify=verify_ssl, config=config
+    )
+
+
+def split_location(location):
+    """(bucket, key prefix) of an s3://, s3a:// or s3n:// location."""
+    parsed = urlparse(location)
+    if parsed.scheme not in ('s3', 's3a', 's3n') or not parsed.netloc:
+        raise ValueError(f'not an S3 location: {location}')
+    return parsed.netloc, parsed.path.strip('/')
+
+
+def content_md5(data):
+    return base64.b64encode(hashlib.md5(data).digest()).decode('ascii')
+
+
+def multipart_etag(path: Path, part_size):
+    """ETag S3 gives a multipart upload of path in part_size parts: MD5 of the part MD5s, then -<parts>."""
+    digests = []
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(part_size), b''):
+            digests.append(hashlib.md5(block).digest())
+    return f'{hashlib.md5(b"".join(digests)).hexdigest()}-{len(digests)}'
+
+
+def read_range(path: Path, offset, length):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def with_retries(fn, retries, what):
+    """fn(), retried with exponential backoff; the last error is raised."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = min(30, 2 ** attempt)
+            print(f'  retrying {what} in {delay}s: {e}')
+            time.sleep(delay)
+
+
+def upload_table(client, table_dir: Path, bucket, prefix, workers=16, part_size=DEFAULT_PART_SIZE, retries=5,
+                 exclude=()):
+    """
+    Upload every file under table_dir to s3://bucket/prefix/<relative path>.
+    Returns (files uploaded, files skipped, bytes uploaded).
+
+    Objects that already exist with the same size and content are skipped.
+    Local files are only read to compare when such an object exists: single
+    uploads store the SHA-256 of their body as metadata, and multipart uploads
+    store their part size so the expected multipart ETag can be recomputed.
+    """
+    files = [
+        p for p in sorted(table_dir.rglob('*'))
+        if p.is_file() and not p.name.endswith('.tmp') and not any(p.name.startswith(e) for e in exclude)
+    ]
+
+    def key_of(path):
+        relative = path.relative_to(table_dir).as_posix()
+        return f'{prefix}/{relative}' if prefix else relative
+
+    def uploaded_already(path):
+        """Whether the object exists with path's size and content."""
+        try:
+            head = client.head_object(Bucket=bucket, Key=key_of(path))
+        except client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        if head['ContentLength'] != path.stat().st_size:
+            return False
+        metadata = head.get('Metadata', {})
+        if 'sha256' in metadata:
+            return avro.file_sha256(path) == metadata['sha256']
+        if metadata.get('part-size', '').isdigit():
+            return multipart_etag(path, int(metadata['part-size'])) == head.get('ETag', '').strip('"')
+        return False
+
+    def put(path):
+        def attempt():
+            data = path.read_bytes()
+            client.put_object(Bucket=bucket, Key=key_of(path), Body=data, ContentMD5=content_md5(data),
+                              Metadata={'sha256': hashlib.sha256(data).hexdigest()})
+        with_retries(attempt, retries, key_of(path))
+
+    def put_part(path, upload_id, number, offset, length):
+        def attempt():
+            data = read_range(path, offset, length)
+            response = client.upload_part(Bucket=bucket, Key=key_of(path), UploadId=upload_id, PartNumber=number,
+                                          Body=data, ContentMD5=content_md5(data))
+            return {'PartNumber': number, 'ETag': response['ETag']}
+        return with_retries(attempt, retries, f'{key_of(path)} part {number}')
+
+    uploaded = skipped = total_bytes = 0
+    singles = []
+    multiparts = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for path, exists in zip(files, pool.map(uploaded_already, files)):
+                if exists:
+                    skipped += 1
+                    continue
+                size = path.stat().st_size
+                total_bytes += size
+                if size <= part_size:
+                    singles.append(pool.submit(put, path))
+                    continue
+                upload_id = with_retries(
+                    lambda: client.create_multipart_upload(Bucket=bucket, Key=key_of(path),
+                                                           Metadata={'part-size': str(part_size)})['UploadId'],
+                    retries, key_of(path)
+                )
+                # Parts of every file share the pool, so one large file still uses all workers
+                parts = [
+                    pool.submit(put_part, path, upload_id, number, offset, min(part_size, size - offset))
+                    for number, offset in enumerate(range(0, size, part_size), 1)
+                ]
+                multiparts.append([path, upload_id, parts])
+
+            for future in singles:
+                future.result()
+                uploaded += 1
+            for upload in multiparts:
+                path, upload_id, parts = upload
+                completed = [part.result() for part in parts]
+                with_retries(
+                    lambda: client.complete_multipart_upload(Bucket=bucket, Key=key_of(path), UploadId=upload_id,
+                                                             MultipartUpload={'Parts': completed}),
+                    retries, key_of(path)
+                )
+                upload[1] = None
+                uploaded += 1
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Incomplete multipart uploads keep their parts (and their cost) until aborted
+            for path, upload_id, _ in multiparts:
+                if upload_id is not None:
+                    try:
+                        client.abort_multipart_upload(Bucket=bucket, Key=key_of(path), UploadId=upload_id)
+                    except Exception as e:
+                        print(f'  WARNING: could not abort the upload of {key_of(path)}: {e}')
+            raise
+    return uploaded, skipped, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Relocate a local copy of an HDFS Iceberg table and upload it to S3-compatible storage.'
+    )
+    parser.add_argument('--table-dir', required=True,
+                        help='Local path to the table directory (contains data/ and metadata/)')
+    parser.add_argument('--old-prefix', required=True,
+                        help='HDFS path prefix to replace, e.g. hdfs://namenode:8020/warehouse/.../table')
+    parser.add_argument('--new-prefix', required=True,
+                        help='S3A path prefix to replace with, e.g. s3a://bucket/warehouse/.../table')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to patch manifest files, threads for delete files (default: 1)')
+    parser.add_argument('--targeted', action='store_true',
+                        help='Only rewrite Iceberg path fields in manifests (see patch_iceberg_avro.py)')
+    parser.add_argument('--journal', default=None,
+                        help=f'Journal file used to resume an interrupted run (default: <table-dir>{avro.JOURNAL_SUFFIX})')
+    parser.add_argument('--no-journal', action='store_true', help='Do not record or resume progress')
+    parser.add_argument('--no-upload', action='store_true', help='Only rewrite the local files')
+    parser.add_argument('--endpoint-url', default=None, help='S3 endpoint, e.g. https://ceph.example.com')
+    parser.add_argument('--access-key', default=os.environ.get('AWS_ACCESS_KEY_ID'))
+    parser.add_argument('--secret-key', default=os.environ.get('AWS_SECRET_ACCESS_KEY'))
+    parser.add_argument('--region', default=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+    parser.add_argument('--no-verify-ssl', action='store_true', help='Do not verify the endpoint certificate')
+    parser.add_argument('--upload-workers', type=int, default=16, help='Concurrent upload requests (default: 16)')
+    parser.add_argument('--part-size-mb', type=int, default=DEFAULT_PART_SIZE // MB,
+                        help='Multipart part size; larger files are uploaded in parts (default: 64)')
+    parser.add_argument('--retries', type=int, default=5, help='Retries per upload request (default: 5)')
+    args = parser.parse_args()
+
+    old = args.old_prefix
+    new = args.new_prefix
+    table_dir = Path(args.table_dir)
+    metadata_dir = table_dir / 'metadata'
+    if not metadata_dir.exists():
+        print(f'ERROR: metadata directory not found: {metadata_dir}')
+        sys.exit(1)
+    if not args.no_upload:
+        try:
+            bucket, prefix = split_location(new)
+        except ValueError as e:
+            print(f'ERROR: {e}')
+            sys.exit(1)
+
+    print(f'Table dir  : {table_dir}')
+    print(f'Old prefix : {old}')
+    print(f'New prefix : {new}')
+
+    journal_path = None
+    journal = None
+    if not args.no_journal:
+        journal_path = args.journal or avro.default_journal_path(table_dir)
+        journal = avro.open_journal(journal_path)
+        try:
+            journal.check_settings(old, new, args.targeted)
+        except ValueError as e:
+            print(f'ERROR: {e}')
+            sys.exit(1)
+
+    try:
+        # Step 1 — metadata JSON
+        json_files = metadata_json_files(metadata_dir)
+        print(f'\nRewriting {len(json_files)} metadata JSON file(s)')
+        for path in json_files:
+            if journal and journal.completed_size(path) is not None:
+                continue
+            avro.journaled(path, journal_path, lambda p, on_written: rewrite_metadata_json(p, old, new, on_written))
+
+        # Step 2 — position delete files, before the manifests that record their sizes
+        print('\nRewriting position delete files')
+        manifest_files = [f for f in sorted(metadata_dir.glob('*.avro')) if not f.name.startswith('snap-')]
+        delete_sizes = relocate_delete_files(table_dir, manifest_files, old, new, args.workers, journal_path)
+
+        # Step 3 — manifests and manifest lists
+        print('\nPatching Avro files')
+        count = avro.patch_metadata_avro(metadata_dir, old, new, args.workers, args.targeted, journal_path,
+                                         delete_sizes)
+    except Exception as e:
+        print(f'ERROR: failed to rewrite table metadata: {e}')
+        sys.exit(1)
+    print(f'\n✓ {len(json_files)} metadata JSON, {len(delete_sizes)} delete and {count} Avro file(s) relocated.')
+
+    if args.no_upload:
+        return
+
+    # Step 4 — upload
+    print(f'\nUploading {table_dir} to s3://{bucket}/{prefix}')
+    client = s3_client(args.endpoint_url, args.access_key, args.secret_key, args.region,
+                       not args.no_verify_ssl, args.upload_workers)
+    start = time.time()
+    try:
+        uploaded, skipped, total_bytes = upload_table(
+            client, table_dir, bucket, prefix, args.upload_workers, args.part_size_mb * MB, args.retries,
+            # a --journal inside the table directory must not be uploaded, nor its -journal/-wal files
+            exclude=(Path(journal_path).name,) if journal_path and avro.path_inside(journal_path, table_dir) else ()
+        )
+    except Exception as e:
+        print(f'ERROR: upload failed: {e}')
+        sys.exit(1)
+    elapsed = max(time.time() - start, 1e-9)
+    print(f'✓ {uploaded} file(s) uploaded ({total_bytes / MB:.1f} MB, {total_bytes / MB / elapsed:.1f} MB/s), '
+          f'{skipped} already present.')
+
+
+if __name__ == '__main__':
+    main()
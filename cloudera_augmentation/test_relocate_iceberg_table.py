@@ -0,0 +1,102 @@
+"""
+Upload tests for relocate_iceberg_table against an in-process moto S3.
+
+    pip install boto3 moto fastavro
+    python -m unittest test_relocate_iceberg_table
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    boto3 = mock_aws = None
+
+import relocate_iceberg_table as relocate
+
+BUCKET = 'warehouse'
+PREFIX = 'db/t'
+# moto enforces S3's 5 MB minimum for every part but the last
+PART_SIZE = 5 * relocate.MB
+
+
+@unittest.skipIf(mock_aws is None, 'needs boto3 and moto')
+class UploadTableTest(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.update(AWS_ACCESS_KEY_ID='test', AWS_SECRET_ACCESS_KEY='test', AWS_DEFAULT_REGION='us-east-1')
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        self.client = boto3.client('s3', region_name='us-east-1')
+        self.client.create_bucket(Bucket=BUCKET)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.table_dir = Path(tmp.name) / 't'
+        (self.table_dir / 'metadata').mkdir(parents=True)
+        (self.table_dir / 'data').mkdir()
+        (self.table_dir / 'metadata' / 'v1.metadata.json').write_text('{"format-version": 2}')
+        (self.table_dir / 'metadata' / 'snap-1.avro').write_bytes(b'avro' * 100)
+        (self.table_dir / 'metadata' / 'snap-1.avro.tmp').write_bytes(b'partial')
+
+    def upload(self, **kwargs):
+        kwargs.setdefault('part_size', PART_SIZE)
+        kwargs.setdefault('retries', 0)
+        return relocate.upload_table(self.client, self.table_dir, BUCKET, PREFIX, workers=4, **kwargs)
+
+    def body(self, relative):
+        return self.client.get_object(Bucket=BUCKET, Key=f'{PREFIX}/{relative}')['Body'].read()
+
+    def test_single_part_upload_and_resume(self):
+        self.assertEqual(self.upload(), (2, 0, 421))
+        self.assertEqual(self.body('metadata/snap-1.avro'), b'avro' * 100)
+        keys = {o['Key'] for o in self.client.list_objects_v2(Bucket=BUCKET)['Contents']}
+        self.assertNotIn(f'{PREFIX}/metadata/snap-1.avro.tmp', keys)
+
+        self.assertEqual(self.upload(), (0, 2, 0))
+
+        # Same size, different content: uploaded again
+        (self.table_dir / 'metadata' / 'snap-1.avro').write_bytes(b'AVRO' * 100)
+        self.assertEqual(self.upload(), (1, 1, 400))
+        self.assertEqual(self.body('metadata/snap-1.avro'), b'AVRO' * 100)
+
+    def test_multipart_upload_and_resume(self):
+        data = os.urandom(2 * PART_SIZE + 1024)
+        (self.table_dir / 'data' / 'big.parquet').write_bytes(data)
+
+        uploaded, skipped, _ = self.upload()
+        self.assertEqual((uploaded, skipped), (3, 0))
+        self.assertEqual(self.body('data/big.parquet'), data)
+
+        self.assertEqual(self.upload(), (0, 3, 0))
+
+    def test_failed_multipart_upload_is_aborted(self):
+        (self.table_dir / 'data' / 'big.parquet').write_bytes(os.urandom(PART_SIZE + 1024))
+        upload_part = self.client.upload_part
+        calls = []
+
+        def failing_upload_part(**kwargs):
+            calls.append(kwargs['PartNumber'])
+            if kwargs['PartNumber'] == 2:
+                raise ConnectionError('connection reset')
+            return upload_part(**kwargs)
+
+        self.client.upload_part = failing_upload_part
+        with self.assertRaises(ConnectionError):
+            self.upload()
+        self.assertIn(2, calls)
+        self.assertEqual(self.client.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []), [])
+
+        # The rerun uploads the large file and skips the ones already there
+        self.client.upload_part = upload_part
+        uploaded, skipped, _ = self.upload()
+        self.assertEqual((uploaded, skipped), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
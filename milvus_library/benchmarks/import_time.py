@@ -0,0 +1,102 @@
+"""
+Import-time benchmark for milvus_library.
+
+Imports every module of the package in a fresh interpreter and fails when the
+import is slower than the budget or performs any network, subprocess or
+pkg_resources work. Run it from the milvus_library project directory:
+
+    python benchmarks/import_time.py --runs 5 --budget-ms 50
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+MODULES = [
+    "milvus_library.utils",
+    "milvus_library.asyncApi",
+    "milvus_library.batchSearch",
+    "milvus_library.bulkInsert",
+    "milvus_library.connection",
+    "milvus_library.engineCache",
+    "milvus_library.getConfigProperties",
+    "milvus_library.getEngineDetails",
+    "milvus_library.getInstanceDetails",
+    "milvus_library.groundTruth",
+    "milvus_library.httpClient",
+    "milvus_library.indexBenchmark",
+    "milvus_library.milvusConnect",
+    "milvus_library.milvusRunner",
+]
+
+# Heavy dependencies that must only be imported when a function needs them
+DEFERRED = ["pkg_resources", "requests", "pymilvus", "grpc", "asyncio"]
+
+# Audit events that mean the import is doing I/O beyond reading source files
+FORBIDDEN_EVENTS = {"socket.connect", "socket.getaddrinfo", "subprocess.Popen", "os.system"}
+
+PROBE = """
+import json, sys, time
+events = []
+forbidden = set({forbidden!r})
+def hook(event, args):
+    if event in forbidden:
+        events.append(event)
+sys.addaudithook(hook)
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "elapsed_ms": elapsed * 1000,
+    "events": events,
+    "deferred": [m for m in {deferred!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(project_dir):
+    code = PROBE.format(forbidden=sorted(FORBIDDEN_EVENTS), modules=MODULES, deferred=DEFERRED)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=project_dir, capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        sys.exit(f"FAIL: importing milvus_library raised:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guard the import time of milvus_library.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Fail when the median import time exceeds this many milliseconds")
+    args = parser.parse_args()
+
+    project_dir = Path(__file__).resolve().parent.parent
+    results = [measure(project_dir) for _ in range(args.runs)]
+    timings = [r["elapsed_ms"] for r in results]
+    median = statistics.median(timings)
+
+    print(f"import time: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.1f} ms exceeds budget of {args.budget_ms} ms")
+    events = sorted({e for r in results for e in r["events"]})
+    if events:
+        failures.append(f"I/O during import: {', '.join(events)}")
+    deferred = sorted({m for r in results for m in r["deferred"]})
+    if deferred:
+        failures.append(f"heavy modules imported eagerly: {', '.join(deferred)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
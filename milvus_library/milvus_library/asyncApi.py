@@ -0,0 +1,109 @@
+import functools, threading
+import milvus_library.utils as utils
+
+# asyncio and concurrent.futures are imported where used to keep the package import cheap
+
+# Worker threads shared by the auth and discovery coroutines
+DEFAULT_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor():
+    from concurrent.futures import ThreadPoolExecutor
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="milvus-async")
+        return _executor
+
+
+async def _offload(executor, fn, *args, **kwargs):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def token(file_path=None):
+    """Async utils.token; concurrent callers share the provider's in-flight refresh."""
+    provider = utils.get_token_provider(file_path or utils.get_config_path())
+    return await _offload(_shared_executor(), provider.get)
+
+
+async def get_engine_details(file_path=None, refresh=False, service_name=None):
+    """Async getEngineDetails, served from the discovery cache when it is fresh."""
+    import milvus_library.getEngineDetails as getEngineDetails
+
+    return await _offload(_shared_executor(), getEngineDetails.getEngineDetails,
+                          file_path, refresh=refresh, service_name=service_name)
+
+
+class AsyncMilvusClient:
+    """
+    Awaitable search/query/insert on top of a milvusConnect.MilvusConnectionPool.
+
+    Each call runs a pooled MilvusClient on a bounded worker pool, so hundreds of
+    coroutines can fan out searches while only `max_workers` threads (and
+    `pool_size` gRPC channels) exist. Create it inside a running event loop:
+
+        async with AsyncMilvusClient(pool_size=8) as client:
+            hits = await asyncio.gather(*(client.search("docs", [v], limit=5) for v in vectors))
+    """
+
+    def __init__(self, service_name=None, pool_size=4, max_workers=16, file_path=None,
+                 strategy="least_busy", pool=None):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.service_name = service_name
+        self.pool_size = pool_size
+        self.file_path = file_path
+        self.strategy = strategy
+        self._pool = pool
+        self._owns_pool = pool is None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="milvus-client")
+        self._pool_ready = asyncio.Lock()
+
+    async def _get_pool(self):
+        async with self._pool_ready:
+            if self._pool is None:
+                import milvus_library.milvusConnect as milvusConnect
+
+                self._pool = await _offload(
+                    self._executor, milvusConnect.MilvusConnectionPool,
+                    self.service_name, size=self.pool_size, strategy=self.strategy,
+                    file_path=self.file_path
+                )
+            return self._pool
+
+    def _call(self, pool, method, args, kwargs):
+        with pool.acquire() as client:
+            return getattr(client, method)(*args, **kwargs)
+
+    async def _run(self, method, *args, **kwargs):
+        pool = await self._get_pool()
+        return await _offload(self._executor, self._call, pool, method, args, kwargs)
+
+    async def search(self, collection_name, data, **kwargs):
+        return await self._run("search", collection_name, data, **kwargs)
+
+    async def query(self, collection_name, **kwargs):
+        return await self._run("query", collection_name, **kwargs)
+
+    async def insert(self, collection_name, data, **kwargs):
+        return await self._run("insert", collection_name, data, **kwargs)
+
+    async def close(self):
+        if self._pool is not None and self._owns_pool:
+            await _offload(self._executor, self._pool.close)
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        await self._get_pool()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -0,0 +1,138 @@
+import time
+
+# Milvus caps nq per request; smaller batches also keep each gRPC message well under 64 MB
+DEFAULT_BATCH_SIZE = 1024
+MAX_REQUEST_BYTES = 32 * 1024 * 1024
+# Milvus returns at most this many rows per query, so primary-key lookups are split to stay within it
+MAX_QUERY_ROWS = 16384
+
+
+def _batch_rows(queries, batch_size):
+    row_bytes = queries.shape[1] * queries.itemsize
+    return max(1, min(batch_size, MAX_REQUEST_BYTES // row_bytes))
+
+
+def _search_orm(collection, batch, anns_field, param, limit, expr):
+    result = collection.search(batch, anns_field, param, limit=limit, expr=expr)
+    # Hits expose their ids and distances as flat lists, so no per-hit objects are built
+    return [(hits.ids, hits.distances) for hits in result]
+
+
+def _search_client(client, collection_name, batch, anns_field, param, limit, expr):
+    result = client.search(collection_name, batch, filter=expr or "", limit=limit,
+                           search_params=param, anns_field=anns_field)
+    return [([hit["id"] for hit in hits], [hit["distance"] for hit in hits]) for hits in result]
+
+
+def _primary_field(collection, collection_name):
+    if collection_name is None:
+        return collection.primary_field.name
+    description = collection.describe_collection(collection_name)
+    return next(field["name"] for field in description["fields"] if field.get("is_primary"))
+
+
+def _query_ids(collection, collection_name, primary_field, ids, fields):
+    if ids.dtype.kind in "iu":
+        id_list = ", ".join(str(int(i)) for i in ids)
+    else:
+        id_list = ", ".join('"' + str(i).replace('"', '\\"') + '"' for i in ids)
+    expr = f"{primary_field} in [{id_list}]"
+    if collection_name is None:
+        return collection.query(expr=expr, output_fields=fields)
+    return collection.query(collection_name, filter=expr, output_fields=fields)
+
+
+def _fetch_fields(collection, collection_name, primary_field, unique_ids, output_fields):
+    """
+    Look the output fields of unique_ids up and return them aligned to unique_ids.
+
+    The ids are queried in chunks of MAX_QUERY_ROWS, so a batch whose hits
+    exceed Milvus's query result window still resolves.
+    """
+    import numpy as np
+
+    fields = [primary_field] + [f for f in output_fields if f != primary_field]
+    rows = []
+    for start in range(0, len(unique_ids), MAX_QUERY_ROWS):
+        rows.extend(_query_ids(collection, collection_name, primary_field,
+                               unique_ids[start:start + MAX_QUERY_ROWS], fields))
+
+    found = np.asarray([row[primary_field] for row in rows], dtype=unique_ids.dtype)
+    order = np.argsort(found, kind="stable")
+    positions = np.minimum(np.searchsorted(found[order], unique_ids), max(len(found) - 1, 0))
+    # Entities deleted between the search and the query are reported as missing
+    matched = found[order][positions] == unique_ids if len(found) else np.zeros(len(unique_ids), dtype=bool)
+    positions = order[positions] if len(found) else positions
+    columns = {}
+    for name in output_fields:
+        columns[name] = np.asarray([row.get(name) for row in rows])[positions] if len(found) else np.asarray([])
+    return columns, matched
+
+
+def batch_search(collection, queries, anns_field="embeddings", param=None, limit=10, output_fields=None,
+                 expr=None, batch_size=DEFAULT_BATCH_SIZE, collection_name=None):
+    """
+    Run many vector searches and return the results as contiguous NumPy arrays.
+
+    collection is an ORM Collection, or a MilvusClient together with collection_name.
+    queries is a 2-D float32 array; it is split into batches that respect the
+    server's nq and message-size limits. Returns a dict with "ids" (nq, limit),
+    "distances" (nq, limit, float32, +inf where a query had fewer hits),
+    one (nq, limit) array per output field, and "seconds". Output fields are
+    fetched with primary-key queries per batch rather than read hit by hit;
+    their entries for missing hits are zero/empty, so mask them with "ids".
+    """
+    import numpy as np
+
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    if queries.ndim != 2:
+        raise ValueError("queries must be a 2-D array of shape (nq, dim)")
+    param = param or {"metric_type": "L2", "params": {"nprobe": 10}}
+    output_fields = list(output_fields or [])
+    nq = len(queries)
+    step = _batch_rows(queries, batch_size)
+
+    distances = np.full((nq, limit), np.inf, dtype=np.float32)
+    ids = None
+    fields = {}
+    primary_field = _primary_field(collection, collection_name) if output_fields else None
+
+    start = time.perf_counter()
+    for offset in range(0, nq, step):
+        batch = queries[offset:offset + step]
+        if collection_name is None:
+            results = _search_orm(collection, batch, anns_field, param, limit, expr)
+        else:
+            results = _search_client(collection, collection_name, batch, anns_field, param, limit, expr)
+
+        for row, (hit_ids, hit_distances) in enumerate(results, start=offset):
+            if ids is None and len(hit_ids):
+                string_ids = isinstance(hit_ids[0], str)
+                ids = np.full((nq, limit), "" if string_ids else -1, dtype=object if string_ids else np.int64)
+            count = len(hit_ids)
+            if count:
+                ids[row, :count] = hit_ids
+                distances[row, :count] = hit_distances
+
+        if output_fields and ids is not None:
+            block = ids[offset:offset + len(batch)]
+            present = block != ("" if block.dtype == object else -1)
+            unique_ids, inverse = np.unique(block[present], return_inverse=True)
+            if len(unique_ids):
+                looked_up, matched = _fetch_fields(collection, collection_name, primary_field, unique_ids, output_fields)
+                hit_matched = matched[inverse]
+                rows, cols = np.nonzero(present)
+                rows, cols = rows[hit_matched] + offset, cols[hit_matched]
+                for name, values in looked_up.items():
+                    if name not in fields:
+                        dtype = values.dtype if values.dtype.kind in "biufc" else object
+                        fields[name] = np.zeros((nq, limit), dtype=dtype) if dtype != object else np.full((nq, limit), "", dtype=object)
+                    fields[name][rows, cols] = values[inverse][hit_matched]
+
+    if ids is None:
+        ids = np.full((nq, limit), -1, dtype=np.int64)
+
+    result = {"ids": ids, "distances": distances, "seconds": time.perf_counter() - start}
+    for name in output_fields:
+        result[name] = fields.get(name, np.full((nq, limit), "", dtype=object))
+    return result
@@ -0,0 +1,214 @@
+import itertools, queue, threading, time
+
+FMT = "\n=== {:30} ===\n"
+
+# Upper bound for the encoded size of one insert request; Milvus rejects gRPC messages above 64 MB
+DEFAULT_MAX_CHUNK_BYTES = 16 * 1024 * 1024
+# Chunks encoded ahead of the insert in flight; peak memory is about (prefetch + 1) chunks
+DEFAULT_PREFETCH = 2
+
+_DONE = object()
+
+
+def _row_bytes(chunk):
+    """Rough encoded size of one row of a column chunk, used to size the following chunks."""
+    import numpy as np
+
+    total = 0
+    for column in chunk.values():
+        if isinstance(column, np.ndarray):
+            total += column[:1].nbytes
+        elif len(column):
+            value = column[0]
+            if isinstance(value, (list, tuple)):
+                total += 4 * len(value)
+            elif isinstance(value, (str, bytes)):
+                total += len(value)
+            else:
+                total += 8
+    return max(total, 1)
+
+
+def _slice(chunk, start, stop):
+    return {name: column[start:stop] for name, column in chunk.items()}
+
+
+def _arrow_batch_columns(batch):
+    """Columns of a pyarrow RecordBatch; list/fixed-size-list columns become 2-D float32 arrays."""
+    import numpy as np
+    import pyarrow as pa
+
+    columns = {}
+    for name, column in zip(batch.schema.names, batch.columns):
+        if pa.types.is_fixed_size_list(column.type) or pa.types.is_list(column.type):
+            values = column.flatten().to_numpy(zero_copy_only=False)
+            columns[name] = np.ascontiguousarray(values, dtype=np.float32).reshape(len(column), -1)
+        else:
+            columns[name] = column.to_pylist()
+    return columns
+
+
+def _source_chunks(data, vector_field, primary_field, ids, rows_per_chunk):
+    """Normalise the accepted inputs into column dicts of at most rows_per_chunk rows."""
+    import numpy as np
+
+    if isinstance(data, np.ndarray):
+        for start in range(0, len(data), rows_per_chunk):
+            chunk = {vector_field: np.ascontiguousarray(data[start:start + rows_per_chunk], dtype=np.float32)}
+            if ids is not None:
+                chunk[primary_field] = list(ids[start:start + rows_per_chunk])
+            yield chunk
+        return
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+
+    if pa is not None and isinstance(data, (pa.Table, pa.RecordBatch)):
+        data = data.to_batches(max_chunksize=rows_per_chunk) if isinstance(data, pa.Table) else [data]
+
+    iterator = iter(data)
+    first = next(iterator, None)
+    if first is None:
+        return
+    iterator = itertools.chain([first], iterator)
+
+    if pa is not None and isinstance(first, pa.RecordBatch):
+        for batch in iterator:
+            for start in range(0, batch.num_rows, rows_per_chunk):
+                yield _arrow_batch_columns(batch.slice(start, rows_per_chunk))
+        return
+
+    # Iterator of row dicts
+    while True:
+        rows = list(itertools.islice(iterator, rows_per_chunk))
+        if not rows:
+            return
+        yield {name: [row[name] for row in rows] for name in rows[0]}
+
+
+def _resize(chunks, max_chunk_bytes):
+    """Re-cut a stream of column chunks so that each stays under max_chunk_bytes."""
+    for chunk in chunks:
+        rows = len(next(iter(chunk.values())))
+        step = max(1, max_chunk_bytes // _row_bytes(chunk))
+        if rows <= step:
+            yield chunk
+            continue
+        for start in range(0, rows, step):
+            yield _slice(chunk, start, start + step)
+
+
+class _Target:
+    """Uniform insert/upsert over an ORM Collection or a MilvusClient plus collection name."""
+
+    def __init__(self, collection, collection_name=None):
+        self.collection = collection
+        self.collection_name = collection_name
+
+    def _rows(self, chunk):
+        import numpy as np
+
+        names = list(chunk)
+        columns = [chunk[n].tolist() if isinstance(chunk[n], np.ndarray) and chunk[n].ndim == 1 else chunk[n]
+                   for n in names]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+    def write(self, chunk, upsert=False):
+        method = self.collection.upsert if upsert else self.collection.insert
+        if self.collection_name is not None:
+            return method(self.collection_name, self._rows(chunk))
+        # Column-based insert in schema order keeps the vector column as one ndarray
+        return method([chunk[field.name] for field in self.collection.schema.fields if field.name in chunk])
+
+    def flush(self):
+        if self.collection_name is None:
+            self.collection.flush()
+        elif hasattr(self.collection, "flush"):
+            self.collection.flush(self.collection_name)
+
+
+def bulk_insert(collection, data, collection_name=None, vector_field="embeddings", primary_field="pk",
+                ids=None, max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES, max_chunk_rows=50000,
+                prefetch=DEFAULT_PREFETCH, max_retries=3, flush=True, report_every=10.0):
+    """
+    Stream data into a Milvus collection in size-bounded chunks.
+
+    collection is an ORM Collection, or a MilvusClient together with collection_name.
+    data may be an iterator of row dicts, a 2-D NumPy array of vectors (with ids
+    for the primary field unless it is auto_id), or a pyarrow Table/RecordBatch or
+    an iterator of RecordBatches. The next chunk is encoded on a background
+    thread while the current one is being inserted, so memory stays at roughly
+    (prefetch + 1) chunks. A failed chunk is retried as an upsert, which is
+    idempotent by primary key; chunks without primary keys (auto_id) are not
+    retried. Returns a dict with rows, chunks, retries, seconds and rows_per_s.
+    """
+    target = _Target(collection, collection_name)
+    chunks = queue.Queue(maxsize=max(prefetch, 1))
+    stop = threading.Event()
+    producer_error = []
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in _resize(_source_chunks(data, vector_field, primary_field, ids, max_chunk_rows),
+                                 max_chunk_bytes):
+                if not put(chunk):
+                    return
+        except BaseException as e:
+            producer_error.append(e)
+        put(_DONE)
+
+    producer = threading.Thread(target=produce, name="milvus-bulk-encode", daemon=True)
+    producer.start()
+
+    print(FMT.format("Start bulk inserting entities"))
+    stats = {"rows": 0, "chunks": 0, "retries": 0}
+    start = last_report = time.perf_counter()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _DONE:
+                break
+            rows = len(next(iter(chunk.values())))
+            attempt = 0
+            while True:
+                try:
+                    target.write(chunk, upsert=attempt > 0)
+                    break
+                except Exception:
+                    if primary_field not in chunk or attempt >= max_retries:
+                        raise
+                    attempt += 1
+                    stats["retries"] += 1
+                    time.sleep(min(2 ** attempt, 30) * 0.1)
+            stats["rows"] += rows
+            stats["chunks"] += 1
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                print(f"inserted {stats['rows']} rows, {stats['rows'] / (now - start):.0f} rows/s")
+                last_report = now
+    finally:
+        stop.set()
+        producer.join()
+
+    if producer_error:
+        raise producer_error[0]
+    if flush:
+        target.flush()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_s"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(f"inserted {stats['rows']} rows in {stats['chunks']} chunks, "
+          f"{stats['seconds']:.2f}s, {stats['rows_per_s']:.0f} rows/s")
+    return stats
@@ -1,16 +1,16 @@
-import configparser, requests, pkg_resources
+import configparser
 from urllib.parse import urlparse
-from pymilvus import connections
+import milvus_library.utils as utils
 import warnings
 warnings.filterwarnings("ignore")
 fmt = "\n=== {:30} ===\n"
 search_latency_fmt = "search latency = {:.4f}s"
-file_path = pkg_resources.resource_filename("milvus_library", "config.properties")
 
-def setup_milvus_connection():
+def setup_milvus_connection(file_path=None):
+    from pymilvus import connections
 
     config=configparser.ConfigParser()
-    config.read(file_path)
+    config.read(file_path or utils.get_config_path())
     platform = config.get('GENERAL','platform')
     url= config.get('MILVUS', 'milvus_grpc_url')
     parsed_url = urlparse(url)
@@ -42,4 +42,3 @@ def setup_milvus_connection():
         )
     print(fmt.format("Milvus Connection Established"))
     warnings.filterwarnings("ignore")
-setup_milvus_connection()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import json, os, threading, time, hashlib, tempfile
+
+# Seconds a discovered engine stays valid before getEngineDetails asks the API again
+DEFAULT_TTL = 24 * 60 * 60
+
+_lock = threading.Lock()
+
+
+def cache_path():
+    """Location of the on-disk discovery cache, overridable with MILVUS_LIBRARY_CACHE_DIR."""
+    cache_dir = os.environ.get("MILVUS_LIBRARY_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "milvus_library")
+    return os.path.join(cache_dir, "engines.json")
+
+
+def cache_key(config):
+    """Key a discovery result by platform, instance id (CPD) or CRN (SaaS) and service name."""
+    platform = config.get("GENERAL", "platform")
+    service_name = config.get("GENERAL", "service_name", fallback="")
+    if platform == "cpd":
+        instance = config.get("CPD", "instanceid", fallback="")
+    else:
+        instance = config.get("SAAS", "crn", fallback="")
+    return f"{platform}:{instance}:{service_name}"
+
+
+def _read_all():
+    try:
+        with open(cache_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_all(entries):
+    path = cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load(key):
+    """Return the cached entry for key, expired or not, or None."""
+    with _lock:
+        return _read_all().get(key)
+
+
+def is_fresh(entry, ttl=DEFAULT_TTL):
+    return entry is not None and time.time() - entry.get("fetched_at", 0) < ttl
+
+
+def store(key, entry):
+    """Persist entry under key, stamping it with the current time."""
+    entry = dict(entry, fetched_at=time.time())
+    with _lock:
+        entries = _read_all()
+        entries[key] = entry
+        _write_all(entries)
+    return entry
+
+
+def invalidate(key=None):
+    """Drop one cached engine, or every cached engine when key is None."""
+    with _lock:
+        if key is None:
+            entries = {}
+        else:
+            entries = _read_all()
+            if entries.pop(key, None) is None:
+                return
+        _write_all(entries)
+
+
+def cert_fingerprint(host, port=443, timeout=10):
+    """SHA-256 fingerprint of the certificate a TLS endpoint presents, without verifying it."""
+    import socket, ssl
+
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    with socket.create_connection((host, int(port)), timeout=timeout) as sock:
+        with context.wrap_socket(sock, server_hostname=host) as tls:
+            der = tls.getpeercert(binary_form=True)
+    return hashlib.sha256(der).hexdigest()
@@ -1,8 +1,7 @@
-import pkg_resources, configparser
+import configparser, milvus_library.utils as utils
 
-file_path = pkg_resources.resource_filename("milvus_library", "config.properties")
-
-def getConfigProperties(file_path):
+def getConfigProperties(file_path=None):
+    file_path = file_path or utils.get_config_path()
     config=configparser.ConfigParser()
     config.read(file_path)
     platform = input("Platform type: ")
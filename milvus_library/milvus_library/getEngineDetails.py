@@ -1,105 +1,167 @@
-import pkg_resources, requests, configparser, milvus_library.utils as utils, subprocess
+import configparser, os, milvus_library.utils as utils, milvus_library.httpClient as httpClient, milvus_library.engineCache as engineCache, subprocess
 import warnings
 warnings.filterwarnings("ignore")
-file_path = pkg_resources.resource_filename("milvus_library", "config.properties")
 fmt = "\n=== {:30} ===\n"
-def getEngineDetails(file_path):
-    config=configparser.ConfigParser()
-    config.read(file_path)
-    token = utils.token(file_path)
-    platform = config.get("GENERAL", "platform")
-
-
-    print(fmt.format("Reading the Config Properties"))
-    if(platform == 'cpd'):
-
-        cpd_url = config.get("CPD", "cpd_url")
-
-        headers = {
-            'Authorization': f"Bearer {token}",
-            'Content-Type': 'application/json'
-        }
-        response = requests.get(f"{cpd_url}/zen-data/v3/service_instances?add_on_type=watsonx-data", headers=headers, verify=False)
-
-        json_data = response.json()
-
-        instanceId = config.get("CPD", "instanceId")
-
-        url = f"{cpd_url}/lakehouse/api/v2/milvus_services"
 
-        headers = {
+GRPC_CERT_FILE = "milvus-grpc.crt"
+REST_CERT_FILE = "milvus-rest.crt"
 
-                "LhInstanceId": f"{instanceId}",
-                "Authorization": f"Bearer {token}"
-            }
-        print(fmt.format(f"Sending the request to url: {url}"))
-        response = requests.get(headers=headers, url=url, verify=False)
-        
-        json_data = response.json()
 
-        httpsHost = json_data["milvus_services"][0]["https_host"]
-        grpcHost = json_data["milvus_services"][0]["grpc_host"]
-        serviceId = json_data["milvus_services"][0]["service_id"]
+def _fetch_cpd_engine(config, token):
+    cpd_url = config.get("CPD", "cpd_url")
+    instanceId = config.get("CPD", "instanceId")
 
-        config.set("MILVUS", "milvus_grpc_url", grpcHost)
-        config.set("MILVUS", "milvus_rest_url", httpsHost)
-        config.set("MILVUS", "service_id", serviceId)
-        print(f"milvus_grpc_url: {grpcHost}")
-        print(f"milvus_rest_url: {httpsHost}")
-        print(f"milvus_service_id: {serviceId}")
-        with open("config.properties", "w") as configfile:
-            config.write(configfile)
+    url = f"{cpd_url}/lakehouse/api/v2/milvus_services"
 
-        print(f"---Generating certificates for REST and gRPC connections---")
+    headers = {
 
-        grpc_cert_command = f'echo QUIT | openssl s_client -showcerts -connect {grpcHost}:443 | awk \'/-----BEGIN CERTIFICATE-----/ {{p=1}}; p; /-----END CERTIFICATE-----/ {{p=0}}\' > milvus-grpc.crt'
-        subprocess.run(grpc_cert_command, shell=True)
-
-        
-        rest_cert_command = f'echo QUIT | openssl s_client -showcerts -connect {httpsHost}:443 | awk \'/-----BEGIN CERTIFICATE-----/ {{p=1}}; p; /-----END CERTIFICATE-----/ {{p=0}}\' > milvus-rest.crt'
-        subprocess.run(rest_cert_command, shell=True)
-
-    elif(platform == 'saas'):
-
-        crn = config.get("SAAS", "crn")
-        print(f"CRN: {crn}")
-        saas_url = config.get("SAAS", "url")
-        url = f"{saas_url}/lakehouse/api/v2/milvus_services"
-        
-        headers = {
-            "AuthInstanceID": f"{crn}",
+            "LhInstanceId": f"{instanceId}",
             "Authorization": f"Bearer {token}"
         }
-        print(fmt.format(f"Sending the request to url: {url}"))
-        response = requests.get(
-            headers=headers,
-            url=url,
-            verify=False
-        )
-
-        json_data = response.json()
-        print(fmt.format("API response received"))
-        service_display_name = config.get("GENERAL","service_name")
-        print(f"Service Display Name: {service_display_name}")
-        service_data = next((service for service in json_data["milvus_services"] if service["service_display_name"] == service_display_name), None)
-  
-        grpc_host = service_data["grpc_host"]
-        grpc_port = service_data["grpc_port"]
-        https_port = service_data["https_port"]
-        https_host = service_data["https_host"]
-        serviceId = service_data["service_id"]
-
-        grpc = f"grpc://{grpc_host}:{grpc_port}"
-        rest = f"https://{https_host}:{https_port}"
-        print(f"milvus_grpc_url: {grpc}")
-        print(f"milvus_rest_url: {rest}")
-        print(f"Service Id: {serviceId}")
-        config.set("MILVUS", "milvus_grpc_url", grpc)
-        config.set("MILVUS", "milvus_rest_url", rest)
-        config.set("MILVUS", "service_id", serviceId)
+    print(fmt.format(f"Sending the request to url: {url}"))
+    response = httpClient.get_client().get(headers=headers, url=url, verify=False)
+
+    json_data = response.json()
+    services = json_data["milvus_services"]
+    service_display_name = config.get("GENERAL", "service_name", fallback=None)
+    if service_display_name:
+        service_data = next((service for service in services if service.get("service_display_name") == service_display_name), None)
+        if service_data is None:
+            raise LookupError(f"No Milvus service named '{service_display_name}' found")
+    else:
+        service_data = services[0]
+
+    return {
+        "grpc_host": service_data["grpc_host"],
+        "grpc_port": service_data.get("grpc_port"),
+        "https_host": service_data["https_host"],
+        "https_port": service_data.get("https_port"),
+        "service_id": service_data["service_id"],
+        "milvus_grpc_url": service_data["grpc_host"],
+        "milvus_rest_url": service_data["https_host"],
+    }
+
+
+def _fetch_saas_engine(config, token):
+    crn = config.get("SAAS", "crn")
+    print(f"CRN: {crn}")
+    saas_url = config.get("SAAS", "url")
+    url = f"{saas_url}/lakehouse/api/v2/milvus_services"
+
+    headers = {
+        "AuthInstanceID": f"{crn}",
+        "Authorization": f"Bearer {token}"
+    }
+    print(fmt.format(f"Sending the request to url: {url}"))
+    response = httpClient.get_client().get(
+        headers=headers,
+        url=url,
+        verify=False
+    )
+
+    json_data = response.json()
+    print(fmt.format("API response received"))
+    service_display_name = config.get("GENERAL","service_name")
+    print(f"Service Display Name: {service_display_name}")
+    service_data = next((service for service in json_data["milvus_services"] if service["service_display_name"] == service_display_name), None)
+    if service_data is None:
+        raise LookupError(f"No Milvus service named '{service_display_name}' found")
+
+    grpc_host = service_data["grpc_host"]
+    grpc_port = service_data["grpc_port"]
+    https_port = service_data["https_port"]
+    https_host = service_data["https_host"]
+
+    return {
+        "grpc_host": grpc_host,
+        "grpc_port": grpc_port,
+        "https_host": https_host,
+        "https_port": https_port,
+        "service_id": service_data["service_id"],
+        "milvus_grpc_url": f"grpc://{grpc_host}:{grpc_port}",
+        "milvus_rest_url": f"https://{https_host}:{https_port}",
+    }
+
+
+def _write_cert_chain(host, cert_file):
+    cert_command = f'echo QUIT | openssl s_client -showcerts -connect {host}:443 | awk \'/-----BEGIN CERTIFICATE-----/ {{p=1}}; p; /-----END CERTIFICATE-----/ {{p=0}}\' > {cert_file}'
+    subprocess.run(cert_command, shell=True)
+
+
+def _refresh_certificates(entry, previous):
+    """Regenerate the CPD certificate files only when the server fingerprint changed."""
+    for prefix, host_key, cert_file in (("grpc", "grpc_host", GRPC_CERT_FILE), ("rest", "https_host", REST_CERT_FILE)):
+        fingerprint = engineCache.cert_fingerprint(entry[host_key])
+        entry[f"{prefix}_cert_sha256"] = fingerprint
+        if os.path.exists(cert_file) and previous and previous.get(f"{prefix}_cert_sha256") == fingerprint:
+            print(f"{prefix} certificate unchanged, keeping {cert_file}")
+            continue
+        print(f"---Generating {prefix} certificate {cert_file}---")
+        _write_cert_chain(entry[host_key], cert_file)
+
+
+def getEngineDetails(file_path=None, refresh=False, service_name=None):
+    """
+    Discover the Milvus engine of the configured instance and store its urls in config.properties.
+
+    Results are served from the on-disk discovery cache (see engineCache) until
+    [GENERAL] discovery_cache_ttl seconds have passed; refresh=True bypasses it.
+    Passing a service_name other than the configured one looks that service up
+    (by service_display_name) without touching config.properties.
+    """
+    file_path = file_path or utils.get_config_path()
+    config=configparser.ConfigParser()
+    config.read(file_path)
+    platform = config.get("GENERAL", "platform")
+    persist = service_name is None or service_name == config.get("GENERAL", "service_name")
+    if service_name is not None:
+        config.set("GENERAL", "service_name", service_name)
 
+
+    print(fmt.format("Reading the Config Properties"))
+    key = engineCache.cache_key(config)
+    ttl = config.getint("GENERAL", "discovery_cache_ttl", fallback=engineCache.DEFAULT_TTL)
+    cached = engineCache.load(key)
+
+    if not refresh and engineCache.is_fresh(cached, ttl) and (
+            platform != 'cpd' or (os.path.exists(GRPC_CERT_FILE) and os.path.exists(REST_CERT_FILE))):
+        print(fmt.format("Using cached engine details"))
+        entry = cached
+    else:
+        token = utils.token(file_path)
+        if(platform == 'cpd'):
+            entry = _fetch_cpd_engine(config, token)
+            _refresh_certificates(entry, cached)
+        elif(platform == 'saas'):
+            entry = _fetch_saas_engine(config, token)
+        else:
+            raise ValueError(f"Unsupported platform: {platform}")
+        entry = engineCache.store(key, entry)
+
+    print(f"milvus_grpc_url: {entry['milvus_grpc_url']}")
+    print(f"milvus_rest_url: {entry['milvus_rest_url']}")
+    print(f"Service Id: {entry['service_id']}")
+
+    changed = False
+    for option in ("milvus_grpc_url", "milvus_rest_url", "service_id"):
+        value = str(entry[option])
+        if config.get("MILVUS", option, fallback=None) != value:
+            config.set("MILVUS", option, value)
+            changed = True
+
+    if changed and persist:
         with open(file_path, 'w') as config_file:
                 config.write(config_file)
+    return entry
+
 
-    
-getEngineDetails(file_path)
\ No newline at end of file
+def refreshEngineDetails(file_path=None):
+    """Re-discover the engine, ignoring and replacing the cached entry."""
+    return getEngineDetails(file_path, refresh=True)
+
+
+def invalidateEngineDetails(file_path=None):
+    """Drop the cached discovery result of the configured instance and service."""
+    config=configparser.ConfigParser()
+    config.read(file_path or utils.get_config_path())
+    engineCache.invalidate(engineCache.cache_key(config))
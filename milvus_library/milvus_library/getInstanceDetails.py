@@ -1,13 +1,13 @@
-import requests, configparser, milvus_library.utils as utils
+import configparser, milvus_library.utils as utils, milvus_library.httpClient as httpClient
 import warnings
 warnings.filterwarnings("ignore")
 
-def get_instance_id(token):
-
-    token = utils.token()
+def get_instance_id(file_path=None):
+    file_path = file_path or utils.get_config_path()
+    token = utils.token(file_path)
 
     config=configparser.ConfigParser()
-    config.read('config.properties')
+    config.read(file_path)
 
     cpd_url = config.get("CPD", "cpd_url")
 
@@ -15,12 +15,12 @@ def get_instance_id(token):
         'Authorization': f"Bearer {token}",
         'Content-Type': 'application/json'
     }
-    response = requests.get(f"{cpd_url}/zen-data/v3/service_instances?add_on_type=watsonx-data", headers=headers, verify=False)
+    response = httpClient.get_client().get(f"{cpd_url}/zen-data/v3/service_instances?add_on_type=watsonx-data", headers=headers, verify=False)
 
     json_data = response.json()
 
     instanceId = json_data["service_instances"][0]["id"]
     print(f"Instance ID:{instanceId}")
     config.set("CPD", "instanceId", instanceId)
-    with open('config.properties', 'w') as configfile:
+    with open(file_path, 'w') as configfile:
         config.write(configfile)
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Exact k-NN search on the local CPU, used as ground truth for recall measurements.
+
+Base vectors are read from memory-mapped float32 files (.npy, .fvecs or raw
+.f32/.bin), so a few million 768-d vectors do not have to fit in RAM at once.
+Distances are computed in blocks with matrix multiplications; base blocks are
+spread over worker threads, which run in parallel because NumPy releases the
+GIL inside BLAS. Scores follow Milvus conventions: squared distance for L2
+(smaller is closer), inner product for IP and cosine similarity for COSINE
+(larger is closer).
+
+    python -m milvus_library.groundTruth --base base.npy --queries queries.npy --k 100 --output truth.npy
+"""
+
+import argparse, os, threading
+
+METRICS = ("L2", "IP", "COSINE")
+DEFAULT_BLOCK_ROWS = 16384
+DEFAULT_QUERY_BLOCK = 256
+
+
+def load_vectors(path, dim=None):
+    """Memory-map a float32 vector file: .npy, .fvecs, or raw float32 (.f32/.bin) given dim."""
+    import numpy as np
+
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    if path.endswith(".fvecs"):
+        raw = np.memmap(path, dtype=np.float32, mode="r")
+        dim = int(raw[:1].view(np.int32)[0])
+        # Every row is prefixed with its dimension as int32
+        return raw.reshape(-1, dim + 1)[:, 1:]
+    if dim is None:
+        raise ValueError(f"dim is required to read raw float32 file {path}")
+    return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, dim)
+
+
+def _normalize(block):
+    import numpy as np
+
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    return block / np.maximum(norms, 1e-12)
+
+
+def _merge_top_k(ids, scores, new_ids, new_scores, k):
+    """Keep the k smallest scores per row out of the current and new candidates."""
+    import numpy as np
+
+    all_ids = np.concatenate([ids, new_ids], axis=1)
+    all_scores = np.concatenate([scores, new_scores], axis=1)
+    if all_scores.shape[1] <= k:
+        return all_ids, all_scores
+    top = np.argpartition(all_scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(all_ids, top, axis=1), np.take_along_axis(all_scores, top, axis=1)
+
+
+class ExactSearch:
+    """
+    Brute-force top-k over a (memory-mapped) float32 base.
+
+    Internally every metric is turned into "smaller is better" so one merge
+    routine serves all three; scores are converted back before returning.
+    """
+
+    def __init__(self, base, metric="L2", block_rows=DEFAULT_BLOCK_ROWS, workers=None):
+        if metric not in METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        if isinstance(base, str):
+            base = load_vectors(base)
+        if base.ndim != 2:
+            raise ValueError("base must be a 2-D array of shape (n, dim)")
+        self.base = base
+        self.metric = metric
+        self.block_rows = block_rows
+        self.workers = workers or os.cpu_count() or 1
+        self._norms = None
+        self._norms_lock = threading.Lock()
+
+    def _base_block(self, start, stop):
+        import numpy as np
+
+        block = np.ascontiguousarray(self.base[start:stop], dtype=np.float32)
+        return _normalize(block) if self.metric == "COSINE" else block
+
+    def _block_norms(self, start, stop, block):
+        if self.metric != "L2":
+            return None
+        with self._norms_lock:
+            if self._norms is None:
+                import numpy as np
+                self._norms = np.full(len(self.base), np.nan, dtype=np.float32)
+        norms = self._norms[start:stop]
+        if norms[0] != norms[0]:
+            norms[:] = (block * block).sum(axis=1)
+        return norms
+
+    def _search_range(self, queries, query_norms, k, start, stop):
+        import numpy as np
+
+        nq = len(queries)
+        ids = np.empty((nq, 0), dtype=np.int64)
+        scores = np.empty((nq, 0), dtype=np.float32)
+        for block_start in range(start, stop, self.block_rows):
+            block_stop = min(block_start + self.block_rows, stop)
+            block = self._base_block(block_start, block_stop)
+            block_norms = self._block_norms(block_start, block_stop, block)
+            block_ids = np.arange(block_start, block_stop, dtype=np.int64)
+
+            for q_start in range(0, nq, DEFAULT_QUERY_BLOCK):
+                q = queries[q_start:q_start + DEFAULT_QUERY_BLOCK]
+                products = q @ block.T
+                if self.metric == "L2":
+                    block_scores = query_norms[q_start:q_start + len(q), None] + block_norms[None, :] - 2 * products
+                else:
+                    block_scores = -products
+                kk = min(k, block_scores.shape[1])
+                top = np.argpartition(block_scores, kk - 1, axis=1)[:, :kk]
+                merged = _merge_top_k(
+                    ids[q_start:q_start + len(q)], scores[q_start:q_start + len(q)],
+                    block_ids[top], np.take_along_axis(block_scores, top, axis=1), k
+                )
+                if q_start == 0:
+                    new_ids = np.empty((nq, merged[0].shape[1]), dtype=np.int64)
+                    new_scores = np.empty((nq, merged[0].shape[1]), dtype=np.float32)
+                new_ids[q_start:q_start + len(q)], new_scores[q_start:q_start + len(q)] = merged
+            ids, scores = new_ids, new_scores
+        return ids, scores
+
+    def search(self, queries, k=10):
+        """Return (ids, scores), each (nq, k), sorted from closest to farthest."""
+        import numpy as np
+        from concurrent.futures import ThreadPoolExecutor
+
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        if self.metric == "COSINE":
+            queries = _normalize(queries)
+        query_norms = (queries * queries).sum(axis=1) if self.metric == "L2" else None
+        k = min(k, len(self.base))
+
+        n = len(self.base)
+        per_worker = max(self.block_rows, -(-n // self.workers))
+        ranges = [(start, min(start + per_worker, n)) for start in range(0, n, per_worker)]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            parts = list(executor.map(lambda r: self._search_range(queries, query_norms, k, *r), ranges))
+
+        ids, scores = parts[0]
+        for part_ids, part_scores in parts[1:]:
+            ids, scores = _merge_top_k(ids, scores, part_ids, part_scores, k)
+
+        order = np.argsort(scores, axis=1, kind="stable")
+        ids = np.take_along_axis(ids, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        if self.metric == "L2":
+            scores = np.maximum(scores, 0)
+        else:
+            scores = -scores
+        return ids, scores
+
+
+def exact_top_k(base, queries, k, metric="L2", workers=None):
+    """Exact top-k ids of queries against base."""
+    return ExactSearch(base, metric, workers=workers).search(queries, k)[0]
+
+
+def recall_at_k(found, truth):
+    """Mean fraction of the true top-k ids present in found; negative ids in found are padding."""
+    import numpy as np
+
+    found = np.asarray(found)
+    truth = np.asarray(truth)
+    hits = sum(len(np.intersect1d(f[f >= 0], t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main(argv=None):
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Exact top-k ground truth for recall measurement.")
+    parser.add_argument("--base", required=True, help="Base vectors (.npy, .fvecs, or raw float32 with --dim)")
+    parser.add_argument("--queries", required=True, help="Query vectors in the same formats")
+    parser.add_argument("--dim", type=int, default=None, help="Dimension of raw float32 files")
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--metric", default="L2", choices=METRICS)
+    parser.add_argument("--workers", type=int, default=None, help="Worker threads (default: all cores)")
+    parser.add_argument("--output", required=True, help="Output .npy file for the (nq, k) id matrix")
+    args = parser.parse_args(argv)
+
+    engine = ExactSearch(load_vectors(args.base, args.dim), args.metric, workers=args.workers)
+    ids, _ = engine.search(load_vectors(args.queries, args.dim), args.k)
+    np.save(args.output, ids)
+    print(f"ground truth for {len(ids)} queries written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
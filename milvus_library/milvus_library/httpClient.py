@@ -0,0 +1,131 @@
+import random, threading, time
+from urllib.parse import urlparse
+
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+# Longest wait between retries, including one asked for by a Retry-After header
+DEFAULT_BACKOFF_MAX = 30
+DEFAULT_POOL_SIZE = 10
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Methods that are safe to resend after a read timeout, when the server may already have acted
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class LakehouseClient:
+    """
+    Shared requests.Session for the lakehouse and zen REST APIs.
+
+    Connections are kept alive in a pool, every request gets a timeout, 429 and
+    5xx responses (and connection errors) are retried with jittered exponential
+    backoff capped at backoff_max, and the latency of each endpoint is recorded
+    for stats(). Read timeouts are only retried for idempotent methods, since a
+    POST may already have been applied.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE, verify=False,
+                 backoff_max=DEFAULT_BACKOFF_MAX):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._connection_errors = (requests.ConnectionError, requests.Timeout)
+        self._read_timeout = requests.ReadTimeout
+        self.session = requests.Session()
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _sleep_before_retry(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            # Full jitter keeps concurrent jobs from retrying in lockstep
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+        time.sleep(min(delay, self.backoff_max))
+
+    def _record(self, endpoint, elapsed, retries, failed):
+        with self._stats_lock:
+            entry = self._stats.setdefault(endpoint, {
+                "count": 0, "errors": 0, "retries": 0, "total_s": 0.0, "max_s": 0.0
+            })
+            entry["count"] += 1
+            entry["retries"] += retries
+            entry["total_s"] += elapsed
+            entry["max_s"] = max(entry["max_s"], elapsed)
+            if failed:
+                entry["errors"] += 1
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = f"{method.upper()} {urlparse(url).path}"
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except self._connection_errors as e:
+                resend_unsafe = isinstance(e, self._read_timeout) and method.upper() not in IDEMPOTENT_METHODS
+                if attempt >= self.max_retries or resend_unsafe:
+                    self._record(endpoint, time.perf_counter() - start, attempt, True)
+                    raise
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                self._sleep_before_retry(attempt, response)
+                attempt += 1
+                continue
+
+            self._record(endpoint, time.perf_counter() - start, attempt, response.status_code >= 400)
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """Per-endpoint request counts, errors, retries and latency in seconds."""
+        with self._stats_lock:
+            return {
+                endpoint: dict(entry, mean_s=entry["total_s"] / entry["count"])
+                for endpoint, entry in self._stats.items()
+            }
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide LakehouseClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LakehouseClient()
+        return _client
+
+
+def configure(**kwargs):
+    """Replace the process-wide client, e.g. configure(timeout=(3, 60), max_retries=5)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = LakehouseClient(**kwargs)
+        return _client
@@ -0,0 +1,221 @@
+"""
+Index build/tuning benchmark for Milvus.
+
+Sweeps index types, build parameters and search parameters over synthetic
+datasets of configurable size and dimension, and reports build time, index
+memory, p50/p95/p99 latency, QPS and recall@k against exact ground truth
+computed locally with milvus_library.groundTruth. Runs against Milvus Lite
+(a local .db file) or a standalone server:
+
+    python -m milvus_library.indexBenchmark --uri ./milvus_bench.db --sizes 10000 --dims 128
+    python -m milvus_library.indexBenchmark --uri http://localhost:19530 \\
+        --index-types IVF_FLAT,HNSW --sizes 100000,1000000 --dims 768 --output results.csv
+"""
+
+import argparse, csv, json, time
+
+FMT = "\n=== {:30} ===\n"
+COLLECTION = "index_benchmark"
+VECTOR_FIELD = "vector"
+PRIMARY_FIELD = "id"
+
+# Build parameter grid per index type
+BUILD_PARAMS = {
+    "FLAT": [{}],
+    "IVF_FLAT": [{"nlist": 128}, {"nlist": 1024}],
+    "IVF_SQ8": [{"nlist": 128}, {"nlist": 1024}],
+    "HNSW": [{"M": 16, "efConstruction": 200}, {"M": 32, "efConstruction": 360}],
+    "DISKANN": [{}],
+}
+
+# Search parameter grid per index type
+SEARCH_PARAMS = {
+    "FLAT": [{}],
+    "IVF_FLAT": [{"nprobe": n} for n in (8, 32, 128)],
+    "IVF_SQ8": [{"nprobe": n} for n in (8, 32, 128)],
+    "HNSW": [{"ef": ef} for ef in (64, 128, 256)],
+    "DISKANN": [{"search_list": s} for s in (32, 100)],
+}
+
+
+def estimate_index_mb(index_type, build_params, num_entities, dim):
+    """Rough in-memory index size, used when the server does not expose its own memory metrics."""
+    raw = num_entities * dim * 4
+    if index_type == "FLAT":
+        size = raw
+    elif index_type == "IVF_FLAT":
+        size = raw + build_params.get("nlist", 128) * dim * 4
+    elif index_type == "IVF_SQ8":
+        size = num_entities * dim + build_params.get("nlist", 128) * dim * 4
+    elif index_type == "HNSW":
+        size = raw + num_entities * build_params.get("M", 16) * 2 * 4
+    elif index_type == "DISKANN":
+        # Only the PQ codes stay in memory; the graph and full vectors live on disk
+        size = raw * 0.125
+    else:
+        size = raw
+    return size / (1024 * 1024)
+
+
+def server_memory_mb(metrics_url):
+    """Resident memory reported by a Milvus standalone Prometheus endpoint, or None."""
+    if not metrics_url:
+        return None
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=5) as response:
+            for line in response.read().decode().splitlines():
+                if line.startswith("process_resident_memory_bytes"):
+                    return float(line.split()[-1]) / (1024 * 1024)
+    except OSError:
+        return None
+    return None
+
+
+def _create_collection(client, dim):
+    from pymilvus import DataType, MilvusClient
+
+    if client.has_collection(COLLECTION):
+        client.drop_collection(COLLECTION)
+    schema = MilvusClient.create_schema(auto_id=False)
+    schema.add_field(PRIMARY_FIELD, DataType.INT64, is_primary=True)
+    schema.add_field(VECTOR_FIELD, DataType.FLOAT_VECTOR, dim=dim)
+    client.create_collection(COLLECTION, schema=schema)
+
+
+def _build_index(client, index_type, metric, build_params):
+    client.release_collection(COLLECTION)
+    for name in client.list_indexes(COLLECTION):
+        client.drop_index(COLLECTION, name)
+    index_params = client.prepare_index_params()
+    index_params.add_index(field_name=VECTOR_FIELD, index_type=index_type, metric_type=metric, params=build_params)
+    start = time.perf_counter()
+    client.create_index(COLLECTION, index_params)
+    client.load_collection(COLLECTION)
+    return time.perf_counter() - start
+
+
+def _search_one(client, query, k, metric, search_params):
+    result = client.search(COLLECTION, [query.tolist()], limit=k, anns_field=VECTOR_FIELD,
+                           search_params={"metric_type": metric, "params": search_params})
+    return [hit["id"] for hit in result[0]]
+
+
+def _run_searches(client, queries, k, metric, search_params, concurrency):
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+
+    latencies = np.empty(len(queries))
+    found = np.full((len(queries), k), -1, dtype=np.int64)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        ids = _search_one(client, query, k, metric, search_params)
+        latencies[i] = time.perf_counter() - start
+        found[i, :len(ids)] = ids
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda q: _search_one(client, q, k, metric, search_params), queries))
+    qps = len(queries) / (time.perf_counter() - start)
+    return latencies, found, qps
+
+
+def run_benchmark(uri, sizes, dims, index_types, metric="L2", num_queries=1000, k=10,
+                  concurrency=8, token="", metrics_url=None, seed=19530):
+    """Run the sweep and return one result dict per (size, dim, index, build params, search params)."""
+    import numpy as np
+    from pymilvus import MilvusClient
+    from milvus_library.bulkInsert import bulk_insert
+    from milvus_library.groundTruth import exact_top_k, recall_at_k
+
+    client = MilvusClient(uri=uri, token=token)
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for num_entities in sizes:
+        for dim in dims:
+            print(FMT.format(f"Dataset {num_entities} x {dim}"))
+            base = rng.random((num_entities, dim), dtype=np.float32)
+            queries = rng.random((num_queries, dim), dtype=np.float32)
+            truth = exact_top_k(base, queries, k, metric)
+
+            _create_collection(client, dim)
+            bulk_insert(client, base, collection_name=COLLECTION, vector_field=VECTOR_FIELD,
+                        primary_field=PRIMARY_FIELD, ids=range(num_entities))
+
+            for index_type in index_types:
+                for build_params in BUILD_PARAMS.get(index_type, [{}]):
+                    try:
+                        build_s = _build_index(client, index_type, metric, build_params)
+                    except Exception as e:
+                        print(f"skipping {index_type} {build_params}: {e}")
+                        continue
+                    memory_mb = server_memory_mb(metrics_url)
+
+                    for search_params in SEARCH_PARAMS.get(index_type, [{}]):
+                        latencies, found, qps = _run_searches(client, queries, k, metric, search_params, concurrency)
+                        row = {
+                            "num_entities": num_entities,
+                            "dim": dim,
+                            "index_type": index_type,
+                            "build_params": json.dumps(build_params),
+                            "search_params": json.dumps(search_params),
+                            "build_s": round(build_s, 3),
+                            "index_mb_estimate": round(estimate_index_mb(index_type, build_params, num_entities, dim), 1),
+                            "server_rss_mb": round(memory_mb, 1) if memory_mb is not None else None,
+                            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+                            "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+                            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+                            "qps": round(qps, 1),
+                            f"recall@{k}": round(recall_at_k(found, truth), 4),
+                        }
+                        print(row)
+                        results.append(row)
+
+    client.drop_collection(COLLECTION)
+    return results
+
+
+def write_results(results, output):
+    if output.endswith(".json"):
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        return
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Milvus index types and parameters.")
+    parser.add_argument("--uri", default="./milvus_bench.db",
+                        help="Milvus Lite file or standalone url, e.g. http://localhost:19530")
+    parser.add_argument("--token", default="", help="user:password or API token for a secured server")
+    parser.add_argument("--sizes", type=_int_list, default=[10000], help="Comma separated dataset sizes")
+    parser.add_argument("--dims", type=_int_list, default=[128], help="Comma separated vector dimensions")
+    parser.add_argument("--index-types", default=",".join(BUILD_PARAMS),
+                        help="Comma separated index types to sweep")
+    parser.add_argument("--metric", default="L2", choices=["L2", "IP", "COSINE"])
+    parser.add_argument("--queries", type=int, default=1000, help="Number of query vectors")
+    parser.add_argument("--k", type=int, default=10, help="Top-k for search and recall")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads for the QPS run")
+    parser.add_argument("--metrics-url", default=None,
+                        help="Prometheus endpoint of a standalone server, e.g. http://localhost:9091/metrics")
+    parser.add_argument("--output", default=None, help="Write results to a .csv or .json file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.uri, args.sizes, args.dims, args.index_types.split(","), args.metric,
+                            args.queries, args.k, args.concurrency, args.token, args.metrics_url)
+    if args.output and results:
+        write_results(results, args.output)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
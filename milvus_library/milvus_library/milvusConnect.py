@@ -1,32 +1,38 @@
-import warnings,configparser
+import warnings,configparser,itertools,threading,time,uuid
+from contextlib import contextmanager
 from urllib.parse import urlparse
-from pymilvus import MilvusClient, connections
-import pkg_resources
+import milvus_library.utils as utils
 
 # Authentication enabled with the root user
 
 FMT = "\n=== {:30} ===\n"
-FILE_PATH = pkg_resources.resource_filename("milvus_library", "config.properties")
 
 
-def setup_milvus_client_connection():
+def __getattr__(name):
+    # FILE_PATH is resolved on first access so that importing this module does no I/O
+    if name == "FILE_PATH":
+        return utils.get_config_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _read_config(file_path=None):
     config = configparser.ConfigParser()
-    config.read(FILE_PATH)
+    config.read(file_path or utils.get_config_path())
+    return config
+
+
+def _client_kwargs(config, grpc_url):
+    """MilvusClient arguments for the configured platform and the given gRPC url."""
     platform = config.get('GENERAL', 'platform')
-    url = config.get('MILVUS', 'milvus_grpc_url')
-    parsed_url = urlparse(url)
+    parsed_url = urlparse(grpc_url)
     host = parsed_url.hostname
     port = parsed_url.port
     db_name = config.get('GENERAL', 'database')
-    
-
-    print(FMT.format("Establishing the Milvus connection via Milvus Client"))
 
     if platform == "saas":
         saas_user = config.get('SAAS', 'saas_username')
         saas_pwd = config.get('SAAS', 'password')
-
-        client = MilvusClient(
+        return dict(
             uri=f"https://{saas_user}:{saas_pwd}@{host}:{port}",
             db_name=db_name
         )
@@ -35,29 +41,22 @@ def setup_milvus_client_connection():
         cpd_user = config.get('CPD', 'cpd_username')
         cpd_pwd = config.get('CPD', 'password')
         cert_file = config.get('CPD', 'cpd_cert_path')
-
-        client = MilvusClient(
+        return dict(
             uri=f"https://{cpd_user}:{cpd_pwd}@{host}:{port}",
             server_pem_path=cert_file,
             db_name=db_name
         )
-    
-    print(FMT.format("Milvus Connection Established via MilvusClient"))
-    return client
 
-setup_milvus_client_connection()
+    raise ValueError(f"Unsupported platform: {platform}")
 
-def setup_milvus_orm_connection():
-    config = configparser.ConfigParser()
-    config.read(FILE_PATH)
-    platform = config.get('GENERAL', 'platform')
-    url = config.get('MILVUS', 'milvus_grpc_url')
-    parsed_url = urlparse(url)
 
-    print(FMT.format("Establishing the Milvus connection via ORM"))
+def _orm_kwargs(config, grpc_url):
+    """connections.connect arguments for the configured platform and the given gRPC url."""
+    platform = config.get('GENERAL', 'platform')
+    parsed_url = urlparse(grpc_url)
 
     if platform == "saas":
-        connections.connect(
+        return dict(
             secure=True,
             host=parsed_url.hostname,
             port=parsed_url.port,
@@ -68,16 +67,206 @@ def setup_milvus_orm_connection():
         )
 
     elif platform == "cpd":
-        connections.connect(
+        return dict(
             secure=True,
             server_pem_path=config.get('CPD', 'cpd_cert_path'),
-            server_name=config.get('MILVUS', 'milvus_grpc_url'),
-            host=config.get('MILVUS', 'milvus_grpc_url'),
+            server_name=grpc_url,
+            host=grpc_url,
             port=config.get('CPD', 'cpd_port'),
             user=config.get('CPD', 'cpd_username'),
             password=config.get('CPD', 'password'),
             db_name=config.get('GENERAL', 'database')
         )
 
+    raise ValueError(f"Unsupported platform: {platform}")
+
+
+def setup_milvus_client_connection(file_path=None):
+    from pymilvus import MilvusClient
+
+    config = _read_config(file_path)
+
+    print(FMT.format("Establishing the Milvus connection via Milvus Client"))
+
+    client = MilvusClient(**_client_kwargs(config, config.get('MILVUS', 'milvus_grpc_url')))
+
+    print(FMT.format("Milvus Connection Established via MilvusClient"))
+    return client
+
+
+def setup_milvus_orm_connection(file_path=None, alias="default"):
+    from pymilvus import connections
+
+    config = _read_config(file_path)
+
+    print(FMT.format("Establishing the Milvus connection via ORM"))
+
+    connections.connect(alias=alias, **_orm_kwargs(config, config.get('MILVUS', 'milvus_grpc_url')))
+
     print(FMT.format("Milvus Connection Established via ORM"))
     warnings.filterwarnings("ignore")
+
+
+class _PooledConnection:
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.client = None
+        self.in_use = 0
+        self.checked_at = 0.0
+        # Serializes the health check and reconnect of this slot
+        self.lock = threading.Lock()
+
+
+class MilvusConnectionPool:
+    """
+    Holds `size` connections to one Milvus service and hands them out to threads.
+
+    With connection_type "milvusclient" acquire() yields a MilvusClient; with
+    "orm" it yields a connection alias to pass as `using=` to Collection/utility.
+    Connections are picked round-robin or least-busy, health-checked at most
+    every `health_check_interval` seconds and reconnected when the check fails.
+    A slot is checked and reconnected by one thread at a time, so threads
+    sharing it never replace each other's freshly made connection.
+    """
+
+    def __init__(self, service_name=None, size=4, connection_type="milvusclient",
+                 strategy="round_robin", health_check_interval=30, file_path=None):
+        if connection_type not in ("milvusclient", "orm"):
+            raise ValueError(f"Unsupported connection_type: {connection_type}")
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unsupported strategy: {strategy}")
+        import milvus_library.getEngineDetails as getEngineDetails
+
+        self.file_path = file_path or utils.get_config_path()
+        self.config = _read_config(self.file_path)
+        self.service_name = service_name or self.config.get('GENERAL', 'service_name')
+        self.connection_type = connection_type
+        self.strategy = strategy
+        self.health_check_interval = health_check_interval
+
+        engine = getEngineDetails.getEngineDetails(self.file_path, service_name=self.service_name)
+        self.grpc_url = engine["milvus_grpc_url"]
+
+        prefix = f"{self.service_name}-{uuid.uuid4().hex[:8]}"
+        self._slots = [_PooledConnection(f"{prefix}-{i}") for i in range(size)]
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        for slot in self._slots:
+            self._connect(slot)
+
+    def _connect(self, slot):
+        if self.connection_type == "milvusclient":
+            from pymilvus import MilvusClient
+            slot.client = MilvusClient(**_client_kwargs(self.config, self.grpc_url))
+        else:
+            from pymilvus import connections
+            connections.connect(alias=slot.alias, **_orm_kwargs(self.config, self.grpc_url))
+            slot.client = slot.alias
+        slot.checked_at = time.monotonic()
+
+    def _disconnect(self, slot):
+        try:
+            if self.connection_type == "milvusclient":
+                if slot.client is not None:
+                    slot.client.close()
+            else:
+                from pymilvus import connections
+                connections.disconnect(slot.alias)
+        except Exception:
+            pass
+        slot.client = None
+
+    def _healthy(self, slot):
+        try:
+            if self.connection_type == "milvusclient":
+                slot.client.get_server_version()
+            else:
+                from pymilvus import utility
+                utility.get_server_version(using=slot.alias)
+            return True
+        except Exception:
+            return False
+
+    def _pick(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MilvusConnectionPool is closed")
+            if self.strategy == "least_busy":
+                slot = min(self._slots, key=lambda s: s.in_use)
+            else:
+                slot = self._slots[next(self._next) % len(self._slots)]
+            slot.in_use += 1
+            return slot
+
+    def _stale(self, slot):
+        return slot.client is None or time.monotonic() - slot.checked_at > self.health_check_interval
+
+    def _ensure_connected(self, slot):
+        if not self._stale(slot):
+            return
+        with slot.lock:
+            # Another user of the slot may have checked or reconnected it while we waited
+            if not self._stale(slot):
+                return
+            if slot.client is None or not self._healthy(slot):
+                self._disconnect(slot)
+                self._connect(slot)
+            slot.checked_at = time.monotonic()
+
+    @contextmanager
+    def acquire(self):
+        slot = self._pick()
+        try:
+            self._ensure_connected(slot)
+            yield slot.client
+        finally:
+            with self._lock:
+                slot.in_use -= 1
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        for slot in self._slots:
+            self._disconnect(slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MilvusPoolManager:
+    """One MilvusConnectionPool per service_display_name, created on first use."""
+
+    def __init__(self, size=4, connection_type="milvusclient", strategy="round_robin",
+                 health_check_interval=30, file_path=None):
+        self.pool_options = dict(size=size, connection_type=connection_type, strategy=strategy,
+                                 health_check_interval=health_check_interval, file_path=file_path)
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, service_name=None):
+        with self._lock:
+            pool = self._pools.get(service_name)
+        if pool is not None:
+            return pool
+        # Building a pool discovers the engine and opens connections, so it happens
+        # outside the lock; if another thread published one first, ours is closed
+        pool = MilvusConnectionPool(service_name, **self.pool_options)
+        with self._lock:
+            published = self._pools.setdefault(service_name, pool)
+        if published is not pool:
+            pool.close()
+        return published
+
+    def acquire(self, service_name=None):
+        return self.pool(service_name).acquire()
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
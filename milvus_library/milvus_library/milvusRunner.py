@@ -1,14 +1,14 @@
-import pkg_resources
+import milvus_library.utils as utils
 import milvus_library.getEngineDetails as getEngineDetails, milvus_library.getInstanceDetails as getInstanceDetails, configparser, milvus_library.milvusConnect as milvusConnect
 #import milvus_library.connection as connection,
 
 def main(crn, database, service_name, connection_type, platform):
 
-    file_path = pkg_resources.resource_filename("milvus_library", "config.properties")
+    file_path = utils.get_config_path()
 
 
     config=configparser.ConfigParser()
-    config.read('config.properties')
+    config.read(file_path)
     #platform = config.get('GENERAL','platform')
 
     config.set("SAAS", "crn", crn)
@@ -17,14 +17,14 @@ def main(crn, database, service_name, connection_type, platform):
     config.set("GENERAL", "service_name", service_name)
     config.set("GENERAL", "connection_type", connection_type)
 
-    with open('config.properties', 'w') as configfile:
+    with open(file_path, 'w') as configfile:
                 config.write(configfile)
 
     if (platform == 'cpd'):
 
-        getInstanceDetails.get_instance_id()
-        getEngineDetails.getEngineDetails()
-        milvusConnect.setup_milvus_client_connection()
+        getInstanceDetails.get_instance_id(file_path)
+        getEngineDetails.getEngineDetails(file_path)
+        milvusConnect.setup_milvus_client_connection(file_path)
         #connection.setup_milvus_connection()
         # similaritySearch.similarity_search()
 
@@ -34,10 +34,10 @@ def main(crn, database, service_name, connection_type, platform):
         #connection.setup_milvus_connection()
 
         if (connection_type == "milvusclient"):
-            milvus_client = milvusConnect.setup_milvus_client_connection()
+            milvus_client = milvusConnect.setup_milvus_client_connection(file_path)
             return milvus_client
         elif (connection_type == "orm"):
-            milvusConnect.setup_milvus_orm_connection()  
+            milvusConnect.setup_milvus_orm_connection(file_path)
         
 
     
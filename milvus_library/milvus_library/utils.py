@@ -1,60 +1,209 @@
-import requests, configparser, pkg_resources
-
-file_path = pkg_resources.resource_filename("milvus_library", "config.properties")
-def token(file_path):
-
+import configparser, threading, time, json, base64
+import milvus_library.httpClient as httpClient
+
+
+def get_config_path():
+    """Resolve the packaged config.properties on first use rather than at import time."""
+    from importlib.resources import files
+
+    return str(files("milvus_library").joinpath("config.properties"))
+
+
+def __getattr__(name):
+    # Keeps the module-level ``file_path`` attribute without resolving it on import
+    if name == "file_path":
+        return get_config_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Refresh this many seconds before the token expires
+REFRESH_MARGIN = 60
+# Lifetime assumed when the token carries no readable "exp" claim
+DEFAULT_TOKEN_LIFETIME = 1200
+# Bounds on the wait before a background refresh, so short-lived or already
+# expired tokens cannot make the timer re-authorize in a tight loop
+MIN_REFRESH_DELAY = 5
+MAX_REFRESH_BACKOFF = 300
+
+
+def _decode_expiry(token):
+    """Return the "exp" claim of a JWT as epoch seconds, or None if unreadable."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+class TokenProvider:
+    """
+    Caches the bearer token of one platform/instance in memory.
+
+    The token is refreshed in a background thread REFRESH_MARGIN seconds before
+    it expires, but never sooner than half its lifetime or MIN_REFRESH_DELAY;
+    failed background refreshes are retried with exponential backoff while the
+    cached token is still valid. Callers that find it already expired share a single in-flight
+    authorize request instead of each issuing their own.
+    """
+
+    def __init__(self, platform, url, username, password, instance_id=""):
+        self.platform = platform
+        self.url = url
+        self.username = username
+        self.password = password
+        self.instance_id = instance_id
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+        self._refreshing = False
+        self._error = None
+        self._timer = None
+        self._failures = 0
+
+    def _authorize(self):
+        client = httpClient.get_client()
+
+        if self.platform == 'cpd':
+            response = client.post(
+                url=f"{self.url}/icp4d-api/v1/authorize",
+                json={"username": self.username, "password": self.password},
+                verify=False
+                )
+            token = response.json().get('token')
+
+        elif self.platform == 'saas':
+            response = client.post(
+                url=f"{self.url}/lakehouse/api/v2/auth/authenticate",
+                json={
+                    "username": self.username,
+                    "password": self.password,
+                    "instance_id": self.instance_id,
+                    "instance_name": ""
+                },
+                verify=False
+                )
+            token = response.json().get('accessToken')
+
+        else:
+            raise ValueError(f"Unsupported platform: {self.platform}")
+
+        if not token:
+            raise RuntimeError(f"Authorization failed with status {response.status_code}")
+        return token
+
+    def _valid(self, margin=0):
+        return self._token is not None and time.time() < self._expires_at - margin
+
+    def refresh(self):
+        """Fetch a new token, or wait for the refresh already in flight, and return it."""
+        with self._lock:
+            if self._refreshing:
+                while self._refreshing:
+                    self._refreshed.wait()
+                if self._error is not None:
+                    raise self._error
+                return self._token
+            self._refreshing = True
+            self._error = None
+
+        try:
+            token = self._authorize()
+        except Exception as e:
+            with self._lock:
+                self._error = e
+                self._refreshing = False
+                self._refreshed.notify_all()
+            raise
+
+        expires_at = _decode_expiry(token) or time.time() + DEFAULT_TOKEN_LIFETIME
+        with self._lock:
+            self._token = token
+            self._expires_at = expires_at
+            self._refreshing = False
+            self._failures = 0
+            self._refreshed.notify_all()
+            self._schedule_refresh()
+        return token
+
+    def _schedule_refresh(self, delay=None):
+        """Start the refresh timer; called with the lock held."""
+        if self._timer is not None:
+            self._timer.cancel()
+        if delay is None:
+            lifetime = self._expires_at - time.time()
+            delay = max(lifetime - REFRESH_MARGIN, lifetime / 2, MIN_REFRESH_DELAY)
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            # The cached token stays in use; retry with backoff until it expires,
+            # after which the next get() authorizes in the foreground
+            with self._lock:
+                self._failures += 1
+                delay = min(MIN_REFRESH_DELAY * 2 ** self._failures, MAX_REFRESH_BACKOFF)
+                if self._valid(margin=delay):
+                    self._schedule_refresh(delay)
+                else:
+                    self._timer = None
+
+    def get(self):
+        """Return a valid token, authorizing only when none is cached or it has expired."""
+        with self._lock:
+            if self._valid():
+                return self._token
+        return self.refresh()
+
+    def invalidate(self):
+        """Drop the cached token, e.g. after the server rejected it with a 401."""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_token_provider(file_path):
+    """Return the shared TokenProvider for the platform and instance configured in file_path."""
     config=configparser.ConfigParser()
     config.read(file_path)
     platform = config.get('GENERAL','platform')
-    URL = config.get('SAAS','url')
 
     if(platform =='cpd'):
-
-        cpd_url = config.get('CPD','cpd_url')
-        url= f"{cpd_url}/icp4d-api/v1/authorize"
+        url = config.get('CPD','cpd_url')
         username = config.get('CPD','cpd_username')
         password = config.get('CPD', 'password')
-
-        data = {
-
-            "username": username,
-            "password": password
-        }
-
-        response = requests.post(
-            url=url,
-            json=data,
-            verify=False 
-            )
-        
-        json_response = response.json()
-        token = json_response.get('token')
+        instance_id = config.get('CPD', 'instanceid', fallback='')
 
     elif(platform =='saas'):
-
+        url = config.get('SAAS','url')
         username = config.get('SAAS','saas_username')
-        instance_id = config.get('SAAS','crn')
         password = config.get('SAAS', 'password')
-        url = f"{URL}/lakehouse/api/v2/auth/authenticate"
-
-        data = {
-
-            "username": username,
-            "password": password,
-            "instance_id": instance_id,
-            "instance_name": ""
+        instance_id = config.get('SAAS','crn')
 
-        }
+    else:
+        raise ValueError(f"Unsupported platform: {platform}")
 
-        response = requests.post(
-            url=url,
-            json=data,
-            verify=False  
-            )
+    key = (platform, url, instance_id, username, password)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = TokenProvider(platform, url, username, password, instance_id)
+            _providers[key] = provider
+    return provider
 
-        json_response = response.json()
-        token = json_response.get('accessToken')
 
-    return token
+def token(file_path=None):
 
-token(file_path)
+    return get_token_provider(file_path or get_config_path()).get()